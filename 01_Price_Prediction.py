@@ -1,13 +1,16 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from tensorflow.keras.models import load_model # type: ignore
 import plotly.graph_objects as go
-import yfinance as yf
 from datetime import datetime
-from sklearn.preprocessing import MinMaxScaler
+import model_registry
+import price_store
+import predictor
+import indicators
+import charting
+import instrumentation
 
 st.title("Stock Price Predictor")
+show_timing = instrumentation.start_page("Price Prediction")
 
 # About section
 expander_bar = st.expander("About")
@@ -28,76 +31,85 @@ stock = st.text_input("Enter the Stock ID", "GOOG")
 end = datetime.now()
 start = datetime(end.year-20, end.month, end.day)
 
-google_data = yf.download(stock, start, end)
+google_data = price_store.load_prices(stock, start, end)
 
-model = load_model("Latest_stock_price_model.keras")
+backend = st.sidebar.selectbox('Inference backend', model_registry.BACKENDS,
+    index=model_registry.BACKENDS.index(model_registry.DEFAULT_BACKEND))
+model = model_registry.get_model("Latest_stock_price_model.keras", backend=backend)
 st.subheader("Stock Data")
 st.dataframe(google_data, use_container_width=True)
 
 splitting_len = int(len(google_data)*0.7)
-x_test = pd.DataFrame(google_data.Close[splitting_len:])
 
-# Calculate all MAs
-google_data['MA_for_250_days'] = google_data.Close.rolling(250).mean()
-google_data['MA_for_200_days'] = google_data.Close.rolling(200).mean()
-google_data['MA_for_100_days'] = google_data.Close.rolling(100).mean()
-google_data['MA_for_50_days'] = google_data.Close.rolling(50).mean()
+# Calculate all MAs, cached per ticker and extended in place when new bars arrive
+st.subheader('Select Moving Averages to Display')
+col1, col2 = st.columns(2)
+extra_windows = indicators.parse_windows(col1.text_input('Extra moving average windows (days)', ''))
+ema_windows = indicators.parse_windows(col2.text_input('Exponential moving average windows (days)', ''))
+sma_windows = [250, 200, 100, 50] + [w for w in extra_windows if w not in (250, 200, 100, 50)]
+with instrumentation.timer('indicators'):
+    ma_data = indicators.default_engine().compute(stock, google_data.Close, sma_windows, ema_windows)
 
 # Create a multiselect for choosing MAs
-st.subheader('Select Moving Averages to Display')
 selected_mas = st.multiselect(
     'Choose Moving Averages',
-    ['MA_for_250_days', 'MA_for_200_days', 'MA_for_100_days', 'MA_for_50_days'],
+    list(ma_data.columns),
     default=['MA_for_100_days']
 )
 
+# Both charts are downsampled to the visible span, narrowing it brings back full detail
+span = charting.zoom_slider(google_data.index, 'Zoom to dates')
+
 # Function to plot the graph
 def plot_graph(full_data, selected_mas):
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=full_data.index, y=full_data.Close, name='Close Price', line=dict(color='blue')))
+    fig.add_trace(charting.line_trace(full_data.index, full_data.Close, 'Close Price', 'blue'))
     
     colors = ['orange', 'green', 'red', 'purple']
     for i, ma in enumerate(selected_mas):
-        fig.add_trace(go.Scatter(x=full_data.index, y=full_data[ma], name=ma, line=dict(color=colors[i % len(colors)])))
+        fig.add_trace(charting.line_trace(full_data.index, full_data[ma], ma, colors[i % len(colors)]))
     
     fig.update_layout(height=600, width=1000, title_text="Stock Price Analysis with Moving Averages")
     return fig
 
 # Plot the graph with selected MAs
-st.plotly_chart(plot_graph(google_data, selected_mas))
-
-# Rest of your code remains the same
-scaler = MinMaxScaler(feature_range=(0,1))
-scaled_data = scaler.fit_transform(x_test[['Close']])
-
-x_data = []
-y_data = []
-
-for i in range(100, len(scaled_data)):
-    x_data.append(scaled_data[i-100:i])
-    y_data.append(scaled_data[i])
-
-x_data, y_data = np.array(x_data), np.array(y_data)
-
-predictions = model.predict(x_data)
-
-inv_pre = scaler.inverse_transform(predictions)
-inv_y_test = scaler.inverse_transform(y_data)
-
-ploting_data = pd.DataFrame(
-    {
-        'original_test_data': inv_y_test.reshape(-1),
-        'predictions': inv_pre.reshape(-1)
-    },
-    index = google_data.index[splitting_len+100:]
-)
+with instrumentation.timer('plotly'):
+    st.plotly_chart(plot_graph(charting.visible(pd.concat([google_data.Close, ma_data[selected_mas]], axis=1), span), selected_mas))
+
+# Scale, window and predict the test split
+incremental = st.sidebar.checkbox('Incremental inference', True, help='Reuse stored predictions and only score bars added since the last run')
+if incremental:
+    ploting_data, next_day = predictor.IncrementalPredictor().update(
+        stock, google_data[['Close']], model, model_registry.model_id("Latest_stock_price_model.keras", backend))
+    if next_day is not None:
+        st.metric('Next-day forecast', round(next_day, 2))
+else:
+    ploting_data = predictor.predict_frames({stock: google_data}, model).drop(columns='ticker')
+
+# Multi-day forecast rolled forward from the latest window
+horizon = st.sidebar.number_input('Forecast horizon (days)', min_value=0, max_value=250, value=0)
+forecast = None
+if horizon:
+    forecasts = predictor.forecast_frames({stock: google_data}, model, int(horizon))
+    if stock in forecasts:
+        forecast = forecasts[stock]
+        forecast.index = pd.bdate_range(google_data.index[-1] + pd.offsets.BDay(), periods=int(horizon))
+    else:
+        st.info(f"{stock} has {len(google_data)} bars, a forecast needs at least {predictor.WINDOW}.")
 st.subheader("Original values vs Predicted values")
 st.dataframe(ploting_data, use_container_width=True)
 
 st.subheader('Original Close Price vs Predicted Close price')
+not_used = charting.visible(google_data.Close[:splitting_len+100], span)
+visible_predictions = charting.visible(ploting_data, span)
 fig = go.Figure()
-fig.add_trace(go.Scatter(x=google_data.index[:splitting_len+100], y=google_data.Close[:splitting_len+100], name='Data- not used', line=dict(color='gray')))
-fig.add_trace(go.Scatter(x=ploting_data.index, y=ploting_data['original_test_data'], name='Original Test data', line=dict(color='blue')))
-fig.add_trace(go.Scatter(x=ploting_data.index, y=ploting_data['predictions'], name='Predicted Test data', line=dict(color='red')))
+fig.add_trace(charting.line_trace(not_used.index, not_used, 'Data- not used', 'gray'))
+fig.add_trace(charting.line_trace(visible_predictions.index, visible_predictions['original_test_data'], 'Original Test data', 'blue'))
+fig.add_trace(charting.line_trace(visible_predictions.index, visible_predictions['predictions'], 'Predicted Test data', 'red'))
+if forecast is not None:
+    fig.add_trace(charting.line_trace(forecast.index, forecast, f'{int(horizon)}-day forecast', 'green'))
 fig.update_layout(height=600, width=1000, title_text="Original vs Predicted Close Price")
-st.plotly_chart(fig)
\ No newline at end of file
+with instrumentation.timer('plotly'):
+    st.plotly_chart(fig)
+
+instrumentation.debug_panel(show_timing)
@@ -1,34 +1,33 @@
 import streamlit as st
 import pandas as pd
 import base64
-import plotly.express as px
 import plotly.graph_objects as go
-import seaborn as sns
-import numpy as np
-import yfinance as yf
+import datetime
+import data_access
+import price_store
+import universe
+import charting
+import correlation
+import instrumentation
 
 st.title('S&P 500')
+show_timing = instrumentation.start_page('S&P 500')
 
 # About section
 expander_bar = st.expander("About")
 expander_bar.markdown("""
-* **Python libraries:** base64, pandas, streamlit, plotly, seaborn, numpy, yfinance
+* **Python libraries:** base64, pandas, streamlit, plotly, yfinance, numpy, scipy
 * **Data source:** [Wikipedia](https://en.wikipedia.org/wiki/List_of_S%26P_500_companies), [Yahoo Finance](https://finance.yahoo.com/)
 * This app retrieves the list of S&P 500 companies and their stock closing prices (year-to-date).
 * It allows users to select sectors and companies to visualize stock price trends.
+* The correlation heatmap clusters the daily returns of the selected sectors and averages correlations by sector.
 """)
 
 st.sidebar.header('User Input Features')
 
-# Web scraping of S&P 500 data
-@st.cache_data
-def load_data():
-    url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-    html = pd.read_html(url, header=0)
-    df = html[0]
-    return df
-
-df = load_data()
+# Web scraping of S&P 500 data, cached for a day
+with instrumentation.timer('constituents'):
+    df = data_access.sp500_table()
 sector = df.groupby('GICS Sector')
 
 # Sidebar - Sector selection
@@ -51,35 +50,63 @@ def filedownload(df):
 
 st.markdown(filedownload(df_selected_sector), unsafe_allow_html=True)
 
-# Fetch stock data from yfinance
-data = yf.download(
-        tickers=list(df_selected_sector[:10].Symbol),
-        period="ytd",
-        interval="1d",
-        group_by='ticker',
-        auto_adjust=True,
-        prepost=True,
-        threads=True,
-        proxy=None
-    )
+# Year-to-date range, prices are only fetched once plots are requested
+today = datetime.date.today()
+ytd_start = datetime.date(today.year, 1, 1)
+ytd_end = today + datetime.timedelta(days=1)
+
+# Sidebar - warm the price store for every constituent without blocking the page
+if st.sidebar.checkbox('Preload all S&P 500 prices in background'):
+    price_store.preload_in_background([universe.yahoo_symbol(s) for s in df.Symbol], ytd_start, ytd_end)
 
-# Plot Closing Price of Query Symbol using Plotly
-def price_plot(symbol):
-    df = pd.DataFrame(data[symbol].Close)
-    df['Date'] = df.index
+# Plot Closing Prices of the Query Symbols in one Plotly figure
+def price_plot(symbols):
+    with instrumentation.timer('yf.download'):
+        data = data_access.close_prices([universe.yahoo_symbol(s) for s in symbols], ytd_start, ytd_end)
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df.Date, y=df.Close, mode='lines', name=symbol))
+    for symbol in symbols:
+        column = universe.yahoo_symbol(symbol)
+        if column in data:
+            fig.add_trace(charting.line_trace(data.index, data[column], symbol))
     fig.update_layout(
-        title=symbol,
+        title=', '.join(symbols),
         xaxis_title='Date',
         yaxis_title='Closing Price',
         template='plotly_white'
     )
-    st.plotly_chart(fig)
+    with instrumentation.timer('plotly'):
+        st.plotly_chart(fig)
 
 num_company = st.sidebar.slider('Number of Companies', 1, 5)
 
 if st.button('Show Plots'):
     st.header('Stock Closing Price')
-    for i in list(df_selected_sector.Symbol)[:num_company]:
-        price_plot(i)
+    price_plot(list(df_selected_sector.Symbol)[:num_company])
+
+# Correlation of year-to-date daily returns, the engine covers the whole index and is extended by completed days only
+def correlation_heatmap(companies):
+    symbols = [universe.yahoo_symbol(s) for s in df.Symbol]
+    with instrumentation.timer('yf.download'):
+        close = data_access.close_prices(symbols, ytd_start, ytd_end)
+    returns = correlation.daily_returns(close).reindex(columns=symbols)
+    engine = correlation.engine(f'ytd-{today.year}')
+    with instrumentation.timer('correlation'):
+        engine.update(returns[returns.index < pd.Timestamp(today)])
+        corr = engine.correlation()
+    selected = [universe.yahoo_symbol(s) for s in companies.Symbol]
+    corr = corr.loc[selected, selected]
+    order = correlation.cluster_order(corr)
+    fig = go.Figure(go.Heatmap(z=corr.loc[order, order].to_numpy(), x=order, y=order,
+                               colorscale='RdBu', zmid=0, zmin=-1, zmax=1))
+    fig.update_layout(title='Correlation of daily returns (clustered)', height=800, template='plotly_white')
+    with instrumentation.timer('plotly'):
+        st.plotly_chart(fig)
+    st.subheader('Average correlation within and between sectors')
+    sectors = pd.Series(df['GICS Sector'].to_numpy(), index=symbols)
+    st.dataframe(correlation.sector_correlation(corr, sectors).round(2))
+
+if st.button('Show Correlation Heatmap'):
+    st.header('Correlation of Daily Returns')
+    correlation_heatmap(df_selected_sector)
+
+instrumentation.debug_panel(show_timing)
@@ -0,0 +1,221 @@
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from harness import bench, report, read_baseline, write
+import synthetic
+
+#the loop 01_Price_Prediction.py and the notebook used to build windows with
+def loop_xy(scaled_data, window=100):
+    x_data = []
+    y_data = []
+    for i in range(window, len(scaled_data)):
+        x_data.append(scaled_data[i-window:i])
+        y_data.append(scaled_data[i])
+    return np.array(x_data), np.array(y_data)
+
+def windowing(bars, repeat):
+    from windowing import make_xy
+    scaled = bars[['Close']].to_numpy()
+    x_loop, y_loop = loop_xy(scaled)
+    x_view, y_view = make_xy(scaled)
+    assert np.array_equal(x_loop, x_view) and np.array_equal(y_loop, y_view)
+    n = len(x_view)
+    return [
+        bench('windowing/python loop', lambda: loop_xy(scaled), n, repeat),
+        bench('windowing/sliding view', lambda: make_xy(scaled), n, repeat),
+        bench('windowing/sliding view + copy', lambda: np.ascontiguousarray(make_xy(scaled)[0]), n, repeat),
+    ]
+
+def scaling(bars, repeat):
+    from sklearn.preprocessing import MinMaxScaler
+    test = bars[['Close']].iloc[int(len(bars)*0.7):]
+    scaler = MinMaxScaler(feature_range=(0,1)).fit(test)
+    return [
+        bench('scaler/fit_transform test split', lambda: MinMaxScaler(feature_range=(0,1)).fit_transform(test), len(test), repeat),
+        bench('scaler/transform test split', lambda: scaler.transform(test), len(test), repeat),
+    ]
+
+def predict(bars, repeat, backend=None, batch_sizes=(32, 256, 1024, 4096)):
+    import model_registry
+    from windowing import make_xy
+    model = model_registry.get_model(backend=backend)
+    close = bars[['Close']].to_numpy()
+    x, _ = make_xy((close - close.min()) / (close.max() - close.min()))
+    x = np.ascontiguousarray(x[int(len(x)*0.7):], dtype=np.float32)
+    name = backend or model_registry.DEFAULT_BACKEND
+    return [bench(f'predict/{name} batch {b}', lambda b=b: model.predict(x, batch_size=b, verbose=0), len(x), repeat)
+            for b in batch_sizes]
+
+#30 day paths for many tickers, carried lstm state against re-encoding the window every day
+def forecast(bars, repeat, tickers=100, horizon=30):
+    import model_registry
+    import predictor
+    model = model_registry.get_model(backend='numpy')
+    frames = {f'T{i}': synthetic.ohlcv(len(bars), seed=i) for i in range(tickers)}
+    return [bench(f'forecast/{mode} {tickers} tickers x {horizon} days',
+                  lambda mode=mode: predictor.forecast_frames(frames, model, horizon, mode), tickers * horizon, repeat)
+            for mode in ('state', 'window')]
+
+#full return correlation of an index sized universe, pandas against the engine, plus a one day refresh
+def correlation(bars, repeat, tickers=500, rows=252):
+    import correlation as corr_engine
+    returns = corr_engine.daily_returns(synthetic.capm_frame(tickers, rows + 1).set_index('Date').drop(columns='sp500'))
+    history, latest = returns.iloc[:-1], returns.iloc[-1:]
+
+    def full():
+        engine = corr_engine.CorrelationEngine()
+        engine.update(returns)
+        return engine.correlation()
+
+    # the timed part is the update with the newest day only, on an engine that already holds the history
+    def refresh():
+        engine = corr_engine.CorrelationEngine()
+        engine.update(history)
+        engine.correlation()
+        tracemalloc.start()
+        start = time.perf_counter()
+        engine.update(returns)
+        engine.correlation()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return seconds, peak / 1e6
+
+    cells = returns.size
+    results = [
+        bench(f'correlation/pandas corr {tickers} tickers', lambda: returns.corr(), cells, repeat),
+        bench(f'correlation/engine {tickers} tickers', full, cells, repeat),
+    ]
+    seconds, peak_mb = min(refresh() for _ in range(repeat))
+    results.append({'name': f'correlation/engine one day refresh {tickers} tickers', 'seconds': seconds, 'peak_mb': peak_mb})
+    return results
+
+#naive model that predicts the last value of each window, keeps model internals out of the memory numbers
+class LastValue:
+    def predict(self, x, batch_size=None, verbose=0):
+        return np.asarray(x[:, -1], dtype=np.float32)
+
+#peak traced memory of the prediction pipeline, the old float64 page path against predictor.predict_frames
+def memory(bars, repeat, tickers=(1, 20)):
+    from sklearn.preprocessing import MinMaxScaler
+    import predictor
+    model = LastValue()
+
+    def float64_path(frames):
+        results = []
+        for df in frames.values():
+            df = df.copy()
+            for w in (250, 200, 100, 50):
+                df[f'MA_for_{w}_days'] = df.Close.rolling(w).mean()
+            splitting_len = int(len(df)*0.7)
+            x_test = pd.DataFrame(df.Close[splitting_len:])
+            scaler = MinMaxScaler(feature_range=(0,1))
+            x_data, y_data = loop_xy(scaler.fit_transform(x_test))
+            # keras converts the float64 windows to a float32 tensor before predicting
+            predictions = model.predict(x_data.astype(np.float32))
+            results.append(pd.DataFrame({'original_test_data': scaler.inverse_transform(y_data).reshape(-1),
+                                         'predictions': scaler.inverse_transform(predictions).reshape(-1)},
+                                        index=df.index[splitting_len+100:]))
+        return pd.concat(results)
+
+    results = []
+    for n in tickers:
+        frames = {f'T{i}': synthetic.ohlcv(len(bars), seed=i) for i in range(n)}
+        windows = sum(len(df) - int(len(df)*0.7) - 100 for df in frames.values())
+        results += [
+            bench(f'memory/float64 page path {n} tickers', lambda: float64_path(frames), windows, repeat),
+            bench(f'memory/float32 predict_frames {n} tickers', lambda: predictor.predict_frames(frames, model), windows, repeat),
+        ]
+    return results
+
+def moving_averages(bars, repeat):
+    import indicators
+    close = bars.Close
+    windows = [250, 200, 100, 50]
+    engine = indicators.IndicatorEngine()
+    engine.compute('BENCH', close, windows)
+    return [
+        bench('moving averages/pandas rolling x4', lambda: [close.rolling(w).mean() for w in windows], len(close), repeat),
+        bench('moving averages/cumsum x4', lambda: indicators.sma(close, windows), len(close), repeat),
+        bench('moving averages/engine cached rerun', lambda: engine.compute('BENCH', close, windows), len(close), repeat),
+    ]
+
+def capm(bars, repeat, tickers=(4, 100)):
+    import capm_func
+    results = []
+    for n in tickers:
+        df = synthetic.capm_frame(n)
+        returns = capm_func.daily_return(df)
+        cells = len(df) * n
+        results += [
+            bench(f'capm/daily_return {n} tickers', lambda: capm_func.daily_return(df), cells, repeat),
+            bench(f'capm/normalize {n} tickers', lambda: capm_func.normalize(df), cells, repeat),
+            bench(f'capm/calculate_betas {n} tickers', lambda: capm_func.calculate_betas(returns), cells, repeat),
+            bench(f'capm/calculate_beta loop {n} tickers',
+                  lambda: [capm_func.calculate_beta(returns, c) for c in returns.columns[1:-1]], cells, repeat),
+        ]
+    return results
+
+def figures(bars, repeat):
+    import plotly.graph_objects as go
+    import charting
+    import indicators
+    data = pd.concat([bars.Close, indicators.default_engine().compute('BENCH', bars.Close, [250, 200, 100, 50])], axis=1)
+    points = data.size
+
+    def full():
+        fig = go.Figure([go.Scatter(x=data.index, y=data[c], name=c) for c in data.columns])
+        return fig.to_json()
+
+    def downsampled():
+        fig = go.Figure([charting.line_trace(data.index, data[c], c) for c in data.columns])
+        return fig.to_json()
+
+    print(f'figure payload: full {len(full())/1e6:.2f} MB, downsampled {len(downsampled())/1e6:.2f} MB')
+    return [
+        bench('figure/full scatter + to_json', full, points, repeat),
+        bench('figure/downsampled scattergl + to_json', downsampled, points, repeat),
+    ]
+
+GROUPS = {
+    'windowing': windowing,
+    'scaling': scaling,
+    'predict': predict,
+    'memory': memory,
+    'correlation': correlation,
+    'forecast': forecast,
+    'moving_averages': moving_averages,
+    'capm': capm,
+    'figures': figures,
+}
+
+def main(argv=None):
+    import model_registry
+    parser = argparse.ArgumentParser(description='Benchmarks for the data, feature and inference hot paths, on synthetic data.')
+    parser.add_argument('--only', nargs='+', choices=sorted(GROUPS), help='groups to run, default all')
+    parser.add_argument('--rows', type=int, default=5040, help='bars of synthetic history, 5040 is about 20 years')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--backend', choices=model_registry.BACKENDS, help='model backend for the predict group')
+    parser.add_argument('--output', help='append results as json lines')
+    parser.add_argument('--baseline', help='json lines from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    args = parser.parse_args(argv)
+
+    bars = synthetic.ohlcv(args.rows)
+    results = []
+    for name in args.only or GROUPS:
+        if name == 'predict':
+            results += predict(bars, args.repeat, args.backend)
+        else:
+            results += GROUPS[name](bars, args.repeat)
+
+    regressions = report(results, read_baseline(args.baseline), args.tolerance)
+    if args.output:
+        write(results, args.output)
+    if regressions:
+        raise SystemExit(f"slower than baseline: {', '.join(regressions)}")
+
+if __name__ == '__main__':
+    main()
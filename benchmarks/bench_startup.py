@@ -0,0 +1,112 @@
+import os
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ['SP500.py', '01_Price_Prediction.py', 'pages/02_Fundamental.py', 'pages/03_CAPM_Return.py',
+         'pages/04_Crypto.py', 'pages/05_News.py']
+
+RSS = '''
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+result['max_rss_mb'] = rss / (1024 if sys.platform != 'darwin' else 1024 * 1024)
+print(json.dumps(result))
+'''
+
+# runs in a fresh interpreter, times every import of the page and reports peak RSS
+PROBE = '''
+import sys, time, json, resource
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+{imports}
+result = {{'import_s': time.perf_counter() - start}}
+''' + RSS
+
+# runs the whole page script once in a fresh interpreter with streamlit's headless test runner
+RENDER = '''
+import sys, time, json, resource
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({path!r}, default_timeout={timeout}).run()
+result = {{'render_s': time.perf_counter() - start, 'exceptions': len(at.exception)}}
+''' + RSS
+
+#every module the page script imports, at the top or inside functions and branches, in source order
+#lazy imports are included because the page pays for them on its first full run anyway
+def page_imports(path):
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    nodes = sorted((node for node in ast.walk(tree) if isinstance(node, (ast.Import, ast.ImportFrom))
+                    and not getattr(node, 'level', 0)), key=lambda node: node.lineno)
+    return list(dict.fromkeys(ast.unparse(node) for node in nodes))
+
+def _best(code, key, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=ROOT)
+        if out.returncode != 0:
+            return {'error': out.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(runs, key=lambda r: r[key])
+
+#import time of everything the page imports, and with render the time of a whole first run of the script
+def measure(page, repeat=3, render=False, timeout=60):
+    path = os.path.join(ROOT, page)
+    result = {'page': page, **_best(PROBE.format(root=ROOT, imports='\n'.join(page_imports(path))), 'import_s', repeat)}
+    if render and 'error' not in result:
+        run = _best(RENDER.format(root=ROOT, path=path, timeout=timeout), 'render_s', repeat)
+        if 'error' in run:
+            result['render_error'] = run['error']
+        else:
+            result.update(render_s=run['render_s'], render_rss_mb=run['max_rss_mb'], render_exceptions=run['exceptions'])
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import time and RSS of every page script.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--render', action='store_true', help='also time a full headless run of every page')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds allowed for one rendered run')
+    parser.add_argument('--output', help='append results as json lines')
+    parser.add_argument('--baseline', help='json lines from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r['page']: r for r in map(json.loads, f) if 'error' not in r}
+
+    results = [measure(page, args.repeat, args.render, args.timeout) for page in PAGES]
+    regressions = []
+    for r in results:
+        if 'error' in r:
+            print(f"{r['page']:28s} failed: {r['error']}")
+            continue
+        line = f"{r['page']:28s} {r['import_s']:7.3f} s  {r['max_rss_mb']:7.1f} MB"
+        old = baseline.get(r['page'])
+        if old:
+            line += f"  (was {old['import_s']:.3f} s, {old['max_rss_mb']:.1f} MB)"
+            if r['import_s'] > old['import_s'] * (1 + args.tolerance):
+                regressions.append(r['page'])
+        if 'render_s' in r:
+            line += f"  render {r['render_s']:7.3f} s  {r['render_rss_mb']:7.1f} MB"
+            if r['render_exceptions']:
+                line += f"  ({r['render_exceptions']} exceptions)"
+            if old and 'render_s' in old and r['render_s'] > old['render_s'] * (1 + args.tolerance):
+                regressions.append(r['page'] + ' (render)')
+        elif 'render_error' in r:
+            line += f"  render failed: {r['render_error']}"
+        print(line)
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            for r in results:
+                f.write(json.dumps(r) + '\n')
+    if regressions:
+        raise SystemExit(f"import time regressed for: {', '.join(regressions)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+#best wall time over repeat runs plus peak traced memory of one extra run
+#items is what one call processes (rows, windows, points) and gives the throughput
+def bench(name, func, items=None, repeat=5):
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(times)
+    result = {'name': name, 'seconds': best, 'peak_mb': peak / 1e6}
+    if items:
+        result['items'] = items
+        result['items_per_s'] = items / best
+    return result
+
+def read_baseline(path):
+    if not path:
+        return {}
+    with open(path) as f:
+        return {r['name']: r for r in map(json.loads, f)}
+
+#prints a table and returns the names that got slower than the baseline allows
+def report(results, baseline=None, tolerance=0.25):
+    baseline = baseline or {}
+    regressions = []
+    print(f"{'benchmark':44s} {'time':>11s} {'throughput':>16s} {'peak':>10s}")
+    for r in results:
+        rate = f"{r['items_per_s']:,.0f}/s" if 'items_per_s' in r else ''
+        line = f"{r['name']:44s} {r['seconds']*1000:8.2f} ms {rate:>16s} {r['peak_mb']:7.1f} MB"
+        old = baseline.get(r['name'])
+        if old:
+            change = r['seconds'] / old['seconds'] - 1
+            line += f"  {change:+.0%}"
+            if change > tolerance:
+                regressions.append(r['name'])
+        print(line)
+    return regressions
+
+def write(results, path):
+    with open(path, 'a') as f:
+        for r in results:
+            f.write(json.dumps(r) + '\n')
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+#daily OHLCV bars from a geometric random walk, about 252 rows per year
+def ohlcv(rows=5040, seed=0, start='2005-01-03'):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, rows)))
+    open_ = close * np.exp(rng.normal(0, 0.003, rows))
+    high = np.maximum(open_, close) * (1 + rng.random(rows) * 0.01)
+    low = np.minimum(open_, close) * (1 - rng.random(rows) * 0.01)
+    volume = rng.integers(1_000_000, 50_000_000, rows)
+    index = pd.bdate_range(start, periods=rows, name='Date')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+#closing prices of several tickers plus an sp500 column, laid out like the CAPM page frame
+def capm_frame(tickers=4, rows=1260, seed=0):
+    data = {'Date': pd.bdate_range('2019-01-02', periods=rows)}
+    for i in range(tickers):
+        data[f'T{i}'] = ohlcv(rows, seed + i).Close.to_numpy()
+    data['sp500'] = ohlcv(rows, seed + tickers).Close.to_numpy()
+    return pd.DataFrame(data)
@@ -1,7 +1,8 @@
-import plotly.express as px
 import numpy as np
+import pandas as pd
 
 def interactive_plot(df):
+    import plotly.express as px
     fig = px.line()
     for i in df.columns[1:]:
         fig.add_scatter(x = df['Date'],y = df[i], name = i)
@@ -12,22 +13,34 @@ def interactive_plot(df):
 #normalized prices based on the initial price
 def normalize(df2):
     df = df2.copy()
-    for i in df.columns[1:]:
-        df[i] = df[i]/df[i][0]
+    cols = df.columns[1:]
+    df[cols] = df[cols] / df[cols].iloc[0]
     return df
 
-#daily return
+#daily return in percent for every stock column, first row is 0
 def daily_return(df):
     df_daily_return = df.copy()
-    for i in df.columns[1:]:
-        for j in range(1,len(df)):
-            df_daily_return[i][j] = ((df[i][j]-df[i][j-1])/df[i][j-1])*100
-        df_daily_return[i][0] = 0
-        return df_daily_return
-    
+    cols = df.columns[1:]
+    prices = df[cols].to_numpy(dtype=float)
+    returns = np.zeros_like(prices)
+    returns[1:] = (prices[1:] - prices[:-1]) / prices[:-1] * 100
+    df_daily_return[cols] = returns
+    return df_daily_return
+
+#beta and alpha of every stock against the market column in one pass
+#closed form of the least squares line np.polyfit(market, stock, 1) fits
+def calculate_betas(stocks_daily_return, market='sp500'):
+    cols = [c for c in stocks_daily_return.columns if c not in ('Date', market)]
+    rm = stocks_daily_return[market].to_numpy(dtype=float)
+    rs = stocks_daily_return[cols].to_numpy(dtype=float)
+    rm_mean = rm.mean()
+    rs_mean = rs.mean(axis=0)
+    rm_dev = rm - rm_mean
+    b = rm_dev @ (rs - rs_mean) / (rm_dev @ rm_dev)
+    a = rs_mean - b * rm_mean
+    return pd.Series(b, index=cols), pd.Series(a, index=cols)
+
 #function to calc beta
 def calculate_beta(stocks_daily_return,stock):
-    rm = stocks_daily_return['sp500'].mean()*252
-
-    b,a = np.polyfit(stocks_daily_return['sp500'], stocks_daily_return[stock],1)
-    return b,a
\ No newline at end of file
+    b, a = calculate_betas(stocks_daily_return[['sp500', stock]])
+    return b[stock], a[stock]
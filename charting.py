@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# about one point per horizontal pixel of a 1000px wide figure
+DEFAULT_POINTS = 1000
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+#largest-triangle-three-buckets, keeps the points that preserve the visual shape of a line
+#returns the indices to keep, always including the first and last point
+def lttb(x, y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # average point of every bucket, the last bucket is the final point on its own
+    starts = np.append(edges[:-1], n - 1)
+    counts = np.diff(np.append(starts, n))
+    mean_x = np.add.reduceat(x, starts) / counts
+    mean_y = np.add.reduceat(y, starts) / counts
+    keep = np.empty(n_out, dtype=int)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i+1]
+        # the next bucket's average is the third corner of the triangle
+        cx, cy = mean_x[i+1], mean_y[i+1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (ys - y[a]) - (x[a] - xs) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i+1] = a
+    return keep
+
+#min and max of each bucket in time order, keeps every spike, suits bars and noisy series
+def minmax_indices(y, n_out):
+    n = len(y)
+    buckets = max(n_out // 2, 1)
+    if n <= n_out:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    keep = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            keep.extend(sorted({lo + int(np.nanargmin(y[lo:hi])), lo + int(np.nanargmax(y[lo:hi]))}))
+    return np.array(keep, dtype=int)
+
+#(x, y) reduced to at most max_points, NaN gaps such as the start of a moving average are dropped
+def downsample(x, y, max_points=DEFAULT_POINTS, method='lttb'):
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    valid = ~np.isnan(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    keep = lttb(x, y, max_points) if method == 'lttb' else minmax_indices(y, max_points)
+    return x[keep], y[keep]
+
+#webgl line trace with the series downsampled to the pixel budget
+def line_trace(x, y, name, color=None, max_points=DEFAULT_POINTS, method='lttb'):
+    x, y = downsample(x, y, max_points, method)
+    return go.Scattergl(x=x, y=y, name=name, mode='lines', line=dict(color=color) if color else None)
+
+def bar_trace(x, y, name, max_points=DEFAULT_POINTS):
+    x, y = downsample(x, y, max_points, method='minmax')
+    return go.Bar(x=x, y=y, name=name)
+
+#date range picker, charts re-downsample the chosen span at full detail in place of plotly zoom
+def zoom_slider(index, label='Visible range', key=None, container=None):
+    import streamlit as st
+    container = container or st
+    if len(index) < 2:
+        return index[0] if len(index) else None, index[-1] if len(index) else None
+    first, last = pd.Timestamp(index[0]).to_pydatetime(), pd.Timestamp(index[-1]).to_pydatetime()
+    return container.slider(label, min_value=first, max_value=last, value=(first, last), format='YYYY-MM-DD', key=key)
+
+def visible(data, span):
+    start, end = span
+    if start is None:
+        return data
+    return data[(data.index >= pd.Timestamp(start)) & (data.index <= pd.Timestamp(end))]
@@ -0,0 +1,261 @@
+import os
+import json
+import math
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+
+BASE_URL = 'https://api.coingecko.com/api/v3'
+# the public api allows roughly 30 calls a minute without a key
+CALLS_PER_MINUTE = int(os.environ.get('COINGECKO_CALLS_PER_MINUTE', '30'))
+# largest page the markets endpoint serves
+MAX_PER_PAGE = 250
+
+#requests session with a shared connection pool, retries with exponential backoff on throttling and server errors
+def make_session(retries=3, backoff=0.5, pool_size=8, api_key=None):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET',), respect_retry_after_header=True)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    api_key = api_key or os.environ.get('COINGECKO_API_KEY')
+    if api_key:
+        session.headers['x-cg-demo-api-key'] = api_key
+    return session
+
+#token bucket shared by every thread of a client, acquire blocks until a call fits the budget
+class RateLimiter:
+    def __init__(self, calls_per_minute=CALLS_PER_MINUTE, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = calls_per_minute / 60
+        self.capacity = burst or max(1, calls_per_minute // 6)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+#coin markets for the top coins of a currency, fetched page by page in parallel
+#every page is revalidated with its ETag once the ttl runs out, unchanged pages cost a 304 and no parsing
+#the frame of a currency is kept between calls and only the rows of changed pages are rewritten
+class MarketClient:
+    def __init__(self, base_url=BASE_URL, session=None, per_page=MAX_PER_PAGE, ttl=60, timeout=10,
+                 max_workers=4, limiter=None, clock=time.monotonic):
+        self.base_url = base_url.rstrip('/')
+        self.session = session or make_session(pool_size=max_workers)
+        self.per_page = min(per_page, MAX_PER_PAGE)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.limiter = limiter or RateLimiter()
+        self.clock = clock
+        self.requests = 0
+        self.not_modified = 0
+        self._stats_lock = threading.Lock()
+        # currency -> {'frame', 'pages': {page: (etag, ids)}, 'coins', 'fetched'}
+        self._state = {}
+        # currency -> lock held while that currency refreshes, other currencies never wait on it
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _fetch_page(self, currency, page, etag):
+        self.limiter.acquire()
+        headers = {'If-None-Match': etag} if etag else {}
+        params = {
+            'vs_currency': currency,
+            'order': 'market_cap_desc',
+            'per_page': self.per_page,
+            'page': page,
+            'sparkline': 'false',
+            'price_change_percentage': '1h,24h,7d',
+        }
+        response = self.session.get(f'{self.base_url}/coins/markets', params=params, headers=headers, timeout=self.timeout)
+        with self._stats_lock:
+            self.requests += 1
+            self.not_modified += response.status_code == 304
+        if response.status_code == 304:
+            return page, etag, None
+        response.raise_for_status()
+        return page, response.headers.get('ETag'), response.json()
+
+    def _merge(self, state, results, n_pages):
+        frame = state['frame']
+        pages = state['pages']
+        stale = set()
+        for page in [p for p in pages if p > n_pages]:
+            stale.update(pages.pop(page)[1])
+        changed = []
+        for page, etag, rows in results:
+            if rows is None:
+                continue
+            old = pages.get(page)
+            if old is not None:
+                stale.update(old[1])
+            new = pd.DataFrame(rows)
+            if len(new):
+                new = new.set_index('id')
+            pages[page] = (etag, list(new.index))
+            changed.append(new)
+        if frame is not None:
+            # rows that moved between pages or dropped out of the tracked range
+            current = {i for _, ids in pages.values() for i in ids}
+            gone = [i for i in stale if i not in current]
+            if gone:
+                frame.drop(index=gone, inplace=True)
+        if not changed:
+            return frame
+        new = pd.concat(changed)
+        new = new[~new.index.duplicated(keep='first')]
+        if frame is None:
+            return new
+        known = new.index.intersection(frame.index)
+        columns = new.columns.intersection(frame.columns)
+        if len(known):
+            frame.loc[known, columns] = new.loc[known, columns]
+        added = new.index.difference(frame.index)
+        if len(added):
+            frame = pd.concat([frame, new.loc[added]])
+        return frame
+
+    #top coins of a currency by market cap, at most ttl seconds old
+    def markets(self, currency, coins=100):
+        currency = currency.lower()
+        with self._lock:
+            state = self._state.setdefault(currency, {'frame': None, 'pages': {}, 'coins': 0, 'fetched': None})
+            lock = self._locks.setdefault(currency, threading.Lock())
+        # one refresh per currency, concurrent reruns for it wait instead of fetching the same pages
+        with lock:
+            fresh = (state['frame'] is not None and state['coins'] >= coins
+                     and self.clock() - state['fetched'] < self.ttl)
+            if not fresh:
+                n_pages = math.ceil(coins / self.per_page)
+                etags = {page: state['pages'].get(page, (None,))[0] for page in range(1, n_pages + 1)}
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, n_pages)) as pool:
+                    results = list(pool.map(lambda p: self._fetch_page(currency, p, etags[p]), etags))
+                frame = self._merge(state, results, n_pages)
+                if 'market_cap_rank' in frame:
+                    frame.sort_values('market_cap_rank', inplace=True, na_position='last')
+                state.update(frame=frame, coins=coins, fetched=self.clock())
+            return state['frame'].head(coins).rename_axis('id').reset_index()
+
+    def stats(self):
+        return {'requests': self.requests, 'not_modified': self.not_modified,
+                'currencies': {c: len(s['frame']) for c, s in self._state.items() if s['frame'] is not None}}
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def default_client():
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = MarketClient()
+        return _default_client
+
+def _coin(i):
+    price = 50000 / (i + 1)
+    return {
+        'id': f'coin-{i}', 'symbol': f'c{i}', 'name': f'Coin {i}',
+        'current_price': price, 'market_cap': price * 1e6, 'market_cap_rank': i + 1,
+        'total_volume': price * 1e4,
+        'price_change_percentage_1h_in_currency': ((i * 7) % 11 - 5) / 10,
+        'price_change_percentage_24h_in_currency': ((i * 5) % 13 - 6) / 5,
+        'price_change_percentage_7d_in_currency': ((i * 3) % 17 - 8) / 2,
+    }
+
+#offline stand-in for the markets endpoint on a local port, with pagination, ETags and optional throttling
+#    with LocalMarketServer(coins=1000) as server:
+#        MarketClient(server.url, limiter=RateLimiter(6000)).markets('usd', 1000)
+class LocalMarketServer:
+    def __init__(self, coins=1000, throttle_first=0, delay=0):
+        self.coins = [_coin(i) for i in range(coins)]
+        self.throttle_first = throttle_first
+        self.delay = delay
+        self.log = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    #move the price of the first n coins so their pages get a new ETag
+    def tick(self, n=10, change=0.01):
+        with self._lock:
+            for coin in self.coins[:n]:
+                coin['current_price'] *= 1 + change
+
+    def _respond(self, handler):
+        query = parse_qs(urlparse(handler.path).query)
+        per_page = int(query.get('per_page', ['100'])[0])
+        page = int(query.get('page', ['1'])[0])
+        with self._lock:
+            throttled = self.throttle_first > 0
+            if throttled:
+                self.throttle_first -= 1
+            rows = self.coins[(page - 1) * per_page:page * per_page]
+            body = json.dumps(rows).encode()
+        if self.delay:
+            time.sleep(self.delay)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if throttled:
+            status = 429
+        elif handler.headers.get('If-None-Match') == etag:
+            status = 304
+        else:
+            status = 200
+        with self._lock:
+            self.log.append((page, status))
+        handler.send_response(status)
+        if status == 429:
+            handler.send_header('Retry-After', '0')
+        handler.send_header('ETag', etag)
+        if status == 200:
+            handler.send_header('Content-Type', 'application/json')
+            handler.send_header('Content-Length', str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        else:
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+
+    def __enter__(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._respond(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
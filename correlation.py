@@ -0,0 +1,236 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+CORRELATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'correlation')
+# columns per tile, bounds the temporaries of one update to (rows x BLOCK) and (tickers x BLOCK)
+BLOCK = 128
+MIN_PERIODS = 3
+_STATS = ('n', 'sx', 'sxx', 'sxy')
+
+#daily simple returns of a wide close frame, a ticker's return is NaN until it has two closes
+def daily_returns(close):
+    return close.sort_index().pct_change(fill_method=None).iloc[1:]
+
+#zero filled float32 returns and their validity mask, what the sums are built from
+def _masked(values):
+    mask = ~np.isnan(values)
+    return np.where(mask, values, 0).astype(np.float32), mask.astype(np.float32)
+
+#what was ingested: a hash of the dates and per column the count, sum, sum of squares and position weighted sum
+#of the returns, cheap to recompute on every update and changed by a revised, backfilled or reordered history
+def _fingerprint(index, x, m):
+    x = x.astype(np.float64)
+    w = np.arange(1, len(x) + 1, dtype=np.float64)
+    columns = np.stack([m.sum(axis=0, dtype=np.float64), x.sum(axis=0), (x * x).sum(axis=0), w @ x])
+    dates = hashlib.blake2b(index.values.astype('datetime64[s]').tobytes(), digest_size=8).hexdigest()
+    return {'dates': dates, 'columns': columns.tolist()}
+
+#pairwise complete covariance and correlation of many return series from running sums
+#for returns x_i and validity masks m_i the state holds, per pair (i, j):
+#    n = sum m_i m_j,  sx = sum x_i m_j,  sxx = sum x_i^2 m_j,  sxy = sum x_i x_j
+#new days only add their products to the sums, so a refresh costs the new rows and never the full history
+#a ticker whose already ingested returns changed (a revised bar, a backfilled gap) has its rows and columns of the
+#sums rebuilt from the whole history, other pairs are left alone
+#returns are multiplied in float32 tiles and accumulated in float64, with memmap the sums live in .npy files
+#under path and are updated in place instead of being held in memory
+class CorrelationEngine:
+    def __init__(self, path=None, memmap=False, block=BLOCK, min_periods=MIN_PERIODS):
+        self.path = path
+        self.memmap = memmap and path is not None
+        self.block = block
+        self.min_periods = min_periods
+        self.tickers = []
+        self.last_date = None
+        self.rows = 0
+        self.stats = None
+        self.fingerprint = None
+        self._results = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            self._load()
+
+    def _meta_path(self):
+        return os.path.join(self.path, 'meta.json')
+
+    def _load(self):
+        if not os.path.exists(self._meta_path()):
+            return
+        with open(self._meta_path()) as f:
+            meta = json.load(f)
+        self.tickers = meta['tickers']
+        self.last_date = pd.Timestamp(meta['last_date']) if meta['last_date'] else None
+        self.rows = meta['rows']
+        self.fingerprint = meta.get('fingerprint')
+        mode = 'r+' if self.memmap else None
+        self.stats = {k: np.load(os.path.join(self.path, k + '.npy'), mmap_mode=mode) for k in _STATS}
+
+    def _save(self):
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        if self.memmap:
+            for array in self.stats.values():
+                array.flush()
+        else:
+            for k, array in self.stats.items():
+                np.save(os.path.join(self.path, k + '.npy'), array)
+        with open(self._meta_path(), 'w') as f:
+            json.dump({'tickers': self.tickers, 'rows': self.rows, 'fingerprint': self.fingerprint,
+                       'last_date': str(self.last_date) if self.last_date is not None else None}, f)
+
+    def _reset(self, tickers):
+        n = len(tickers)
+        if self.memmap:
+            os.makedirs(self.path, exist_ok=True)
+            self.stats = {k: np.lib.format.open_memmap(os.path.join(self.path, k + '.npy'), mode='w+',
+                                                       dtype=np.float64, shape=(n, n)) for k in _STATS}
+            for array in self.stats.values():
+                array[:] = 0
+        else:
+            self.stats = {k: np.zeros((n, n)) for k in _STATS}
+        self.tickers = list(tickers)
+        self.last_date = None
+        self.rows = 0
+        self.fingerprint = None
+
+    def _accumulate(self, x, m):
+        xx = x * x
+        n, sx, sxx, sxy = (self.stats[k] for k in _STATS)
+        for lo in range(0, x.shape[1], self.block):
+            hi = lo + self.block
+            m_tile = m[:, lo:hi]
+            n[:, lo:hi] += m.T @ m_tile
+            sx[:, lo:hi] += x.T @ m_tile
+            sxx[:, lo:hi] += xx.T @ m_tile
+            sxy[:, lo:hi] += x.T @ x[:, lo:hi]
+
+    #replace the sums of every pair that involves one of the columns with sums over the rows of x and m
+    def _rebuild(self, x, m, columns):
+        xx = x * x
+        n, sx, sxx, sxy = (self.stats[k] for k in _STATS)
+        for lo in range(0, len(columns), self.block):
+            c = columns[lo:lo + self.block]
+            x_c, m_c = x[:, c], m[:, c]
+            n[:, c] = m.T @ m_c
+            n[c, :] = n[:, c].T
+            sx[:, c] = x.T @ m_c
+            sx[c, :] = x_c.T @ m
+            sxx[:, c] = xx.T @ m_c
+            sxx[c, :] = xx[:, c].T @ m
+            sxy[:, c] = x.T @ x_c
+            sxy[c, :] = sxy[:, c].T
+
+    #add the rows of a dates x tickers returns frame that are newer than the last update
+    #the older rows are checked against what was ingested, tickers whose returns changed are rebuilt
+    #a different ticker set or different dates start over from the whole frame, returns how many rows were added
+    def update(self, returns):
+        returns = returns.sort_index()
+        x, m = _masked(returns.to_numpy(dtype=np.float32))
+        with self._lock:
+            revised = []
+            if self.stats is None or list(returns.columns) != self.tickers or self.fingerprint is None:
+                self._reset(returns.columns)
+            elif self.last_date is not None:
+                seen = int(np.searchsorted(returns.index, self.last_date, side='right'))
+                old = _fingerprint(returns.index[:seen], x[:seen], m[:seen])
+                if seen != self.rows or old['dates'] != self.fingerprint['dates']:
+                    self._reset(returns.columns)
+                else:
+                    same = np.isclose(old['columns'], self.fingerprint['columns'], rtol=1e-12, atol=0).all(axis=0)
+                    revised = np.flatnonzero(~same).tolist()
+                    if revised:
+                        self._rebuild(x[:seen], m[:seen], revised)
+            added = len(returns) - self.rows
+            if not added and not revised:
+                return 0
+            if added:
+                self._accumulate(x[self.rows:], m[self.rows:])
+            self.rows = len(returns)
+            self.last_date = returns.index[-1]
+            self.fingerprint = _fingerprint(returns.index, x, m)
+            self._results.clear()
+            self._save()
+            return added
+
+    def _compute(self):
+        n_t = len(self.tickers)
+        cov = np.empty((n_t, n_t), dtype=np.float32)
+        corr = np.empty((n_t, n_t), dtype=np.float32)
+        n, sx, sxx, sxy = (self.stats[k] for k in _STATS)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for lo in range(0, n_t, self.block):
+                hi = lo + self.block
+                count = n[:, lo:hi]
+                # sx[i, j] sums x_i over the days j is valid too, sx[j, i] the other way round
+                sx_i, sx_j = sx[:, lo:hi], sx[lo:hi, :].T
+                c = (sxy[:, lo:hi] - sx_i * sx_j / count) / (count - 1)
+                var_i = (sxx[:, lo:hi] - sx_i * sx_i / count) / (count - 1)
+                var_j = (sxx[lo:hi, :].T - sx_j * sx_j / count) / (count - 1)
+                enough = count >= self.min_periods
+                cov[:, lo:hi] = np.where(enough, c, np.nan)
+                corr[:, lo:hi] = np.where(enough, np.clip(c / np.sqrt(var_i * var_j), -1, 1), np.nan)
+        return cov, corr
+
+    def _matrices(self):
+        key = (self.last_date, self.rows)
+        with self._lock:
+            if key not in self._results:
+                self._results = {key: self._compute()}
+            return self._results[key]
+
+    def covariance(self):
+        return pd.DataFrame(self._matrices()[0], index=self.tickers, columns=self.tickers)
+
+    def correlation(self):
+        return pd.DataFrame(self._matrices()[1], index=self.tickers, columns=self.tickers)
+
+def _membership(labels, sectors):
+    return (np.asarray(labels)[:, None] == np.asarray(sectors)[None, :]).astype(np.float64)
+
+#average pairwise correlation within every sector (diagonal) and between every pair of sectors
+#labels gives the sector of every row/column of corr, self-correlations are left out
+def sector_correlation(corr, labels):
+    labels = pd.Series(labels, index=corr.index).reindex(corr.index)
+    sectors = sorted(labels.dropna().unique())
+    g = _membership(labels, sectors)
+    c = corr.to_numpy(dtype=np.float64).copy()
+    np.fill_diagonal(c, np.nan)
+    valid = ~np.isnan(c)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (g.T @ np.where(valid, c, 0) @ g) / (g.T @ valid @ g)
+    return pd.DataFrame(mean, index=sectors, columns=sectors)
+
+#covariance of equal weighted sector portfolios, w' cov w with w the normalised sector membership
+def sector_covariance(cov, labels):
+    labels = pd.Series(labels, index=cov.index).reindex(cov.index)
+    sectors = sorted(labels.dropna().unique())
+    w = _membership(labels, sectors)
+    w /= w.sum(axis=0)
+    c = np.nan_to_num(cov.to_numpy(dtype=np.float64))
+    return pd.DataFrame(w.T @ c @ w, index=sectors, columns=sectors)
+
+#order of the rows that puts highly correlated tickers next to each other, average linkage on sqrt((1 - corr) / 2)
+def cluster_order(corr):
+    from scipy.cluster.hierarchy import linkage, leaves_list
+    from scipy.spatial.distance import squareform
+    c = np.nan_to_num(corr.to_numpy(dtype=np.float64), nan=0.0)
+    distance = np.sqrt(np.clip((1 - (c + c.T) / 2) / 2, 0, 1))
+    np.fill_diagonal(distance, 0)
+    if len(distance) < 3:
+        return list(corr.index)
+    order = leaves_list(linkage(squareform(distance, checks=False), method='average'))
+    return list(corr.index[order])
+
+_engines = {}
+_engines_guard = threading.Lock()
+
+#one engine per name, kept for the process and persisted under data/correlation/<name>
+def engine(name, memmap=True):
+    with _engines_guard:
+        if name not in _engines:
+            _engines[name] = CorrelationEngine(os.path.join(CORRELATION_DIR, name), memmap=memmap)
+        return _engines[name]
@@ -0,0 +1,132 @@
+import time
+import threading
+import functools
+from collections import OrderedDict
+import pandas as pd
+
+# seconds to keep a result and how many keys to hold per source
+SOURCES = {
+    'sp500_constituents': (24 * 3600, 4),
+    'ticker_info': (3600, 256),
+    'statements': (6 * 3600, 1024),
+    'fred': (6 * 3600, 64),
+    'close_prices': (15 * 60, 64),
+}
+
+#size bounded LRU where every entry also expires after ttl seconds
+class TTLCache:
+    def __init__(self, ttl, maxsize, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    #concurrent misses on one key share a single load
+    def get_or_load(self, key, load):
+        hit, value = self.get(key)
+        if hit:
+            return value
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._data.get(key)
+            if entry is not None and entry[0] > self.clock():
+                return entry[1]
+            try:
+                value = load()
+                self.set(key, value)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._data), 'ttl': self.ttl}
+
+_caches = {name: TTLCache(ttl, maxsize) for name, (ttl, maxsize) in SOURCES.items()}
+
+def cache(source):
+    return _caches[source]
+
+def stats():
+    return {name: c.stats() for name, c in _caches.items()}
+
+def clear(source=None):
+    for name, c in _caches.items():
+        if source is None or name == source:
+            c.clear()
+
+#route a fetch function through the cache of a source, the key is built from the call arguments
+#frames are copied on the way out so callers can't modify the cached one
+def cached(source, key=None):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs) if key else (func.__name__, args, tuple(sorted(kwargs.items())))
+            value = _caches[source].get_or_load(cache_key, lambda: func(*args, **kwargs))
+            return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+        return wrapper
+    return decorate
+
+@cached('sp500_constituents')
+def sp500_table():
+    import universe
+    return universe.sp500_table()
+
+#top coins by market cap, the client keeps its own frame and revalidates it page by page after a minute
+def crypto_markets(currency, coins=100):
+    import coingecko
+    return coingecko.default_client().markets(currency, coins)
+
+@cached('ticker_info', key=lambda ticker: ticker.upper())
+def ticker_info(ticker):
+    import yfinance as yf
+    return yf.Ticker(ticker).info
+
+#one of balance_sheet, financials or cashflow
+@cached('statements', key=lambda ticker, statement: (ticker.upper(), statement))
+def ticker_statement(ticker, statement):
+    import yfinance as yf
+    return getattr(yf.Ticker(ticker), statement)
+
+@cached('fred', key=lambda series, start, end: (tuple(series), str(start), str(end)))
+def fred(series, start, end):
+    import pandas_datareader.data as web
+    return web.DataReader(list(series), 'fred', start, end)
+
+#wide frame of closing prices, keyed by the exact symbol set and range
+@cached('close_prices', key=lambda symbols, start, end: (tuple(sorted(symbols)), str(start), str(end)))
+def close_prices(symbols, start, end):
+    import price_store
+    return price_store.load_close_frame(symbols, start, end)
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import data_access
+
+STATEMENTS = ('info', 'balance_sheet', 'financials', 'cashflow')
+
+#yahoo through the shared TTL cache, a repeat visit for the same ticker makes no remote call
+def yahoo_provider(ticker, statement):
+    if statement == 'info':
+        return data_access.ticker_info(ticker)
+    return data_access.ticker_statement(ticker, statement)
+
+#offline stand-in, returns canned data after an optional delay and records every request
+class LocalProvider:
+    def __init__(self, data, delay=0):
+        self.data = data
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, ticker, statement):
+        self.calls.append((ticker, statement))
+        if self.delay:
+            time.sleep(self.delay)
+        value = self.data.get(ticker, {}).get(statement)
+        if value is None:
+            raise KeyError(f'no {statement} for {ticker}')
+        return value
+
+#results, errors and seconds spent per statement
+class Fundamentals:
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.data = {}
+        self.errors = {}
+        self.timings = {}
+
+    def get(self, statement):
+        if statement in self.errors:
+            raise self.errors[statement]
+        return self.data[statement]
+
+def _timed(provider, ticker, statement):
+    start = time.perf_counter()
+    try:
+        return statement, provider(ticker, statement), None, time.perf_counter() - start
+    except Exception as e:
+        return statement, None, e, time.perf_counter() - start
+
+#fetch all statements at once, total latency is the slowest statement rather than the sum
+def load(ticker, provider=yahoo_provider, statements=STATEMENTS, max_workers=4):
+    result = Fundamentals(ticker)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(statements))) as pool:
+        for statement, value, error, seconds in pool.map(lambda s: _timed(provider, ticker, s), statements):
+            result.timings[statement] = seconds
+            if error is None:
+                result.data[statement] = value
+            else:
+                result.errors[statement] = error
+    return result
@@ -0,0 +1,139 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+def sma_name(window):
+    return f'MA_for_{window}_days'
+
+def ema_name(window):
+    return f'EMA_for_{window}_days'
+
+#cumulative sum with NaNs counted as 0 and the cumulative count of valid values, both with a leading 0
+def _cumulative(values):
+    valid = ~np.isnan(values)
+    zero = np.zeros(1)
+    return (np.concatenate([zero, np.cumsum(np.where(valid, values, 0.0))]),
+            np.concatenate([zero, np.cumsum(valid)]))
+
+#rolling mean for one window straight from the cumulative sums, NaN until the window is full
+#and wherever the window holds a NaN, like rolling(window).mean()
+def _sma_from_csum(csum, count, window):
+    ma = np.full(len(csum) - 1, np.nan)
+    if len(csum) - 1 >= window:
+        full = (count[window:] - count[:-window]) == window
+        ma[window-1:] = np.where(full, (csum[window:] - csum[:-window]) / window, np.nan)
+    return ma
+
+#simple moving averages for several windows from one cumulative sum
+def sma(values, windows):
+    csum, count = _cumulative(np.asarray(values, dtype=float))
+    return {w: _sma_from_csum(csum, count, w) for w in windows}
+
+#exponential moving average with alpha = 2 / (window + 1), seeded with the first value
+#raw values, callers mask the first window-1 entries like rolling(window).mean() would
+#NaNs carry the last average forward and decay its weight like ewm(adjust=False) does,
+#gap is the number of NaNs since the observation behind previous
+def ema(values, window, previous=None, gap=0):
+    values = np.asarray(values, dtype=float)
+    alpha = 2 / (window + 1)
+    if previous is None:
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    out = np.empty(len(values))
+    last, old = previous, (1 - alpha) ** gap
+    for i, x in enumerate(values):
+        if np.isnan(last):
+            last, old = x, 1.0
+        elif np.isnan(x):
+            old *= 1 - alpha
+        else:
+            old *= 1 - alpha
+            last = (old * last + alpha * x) / (old + alpha)
+            old = 1.0
+        out[i] = last
+    return out
+
+#number of NaNs at the end of values
+def _trailing_nans(values):
+    valid = np.flatnonzero(~np.isnan(values))
+    return len(values) - 1 - valid[-1] if len(valid) else len(values)
+
+#per ticker moving average state, reruns with the same last date are served from the cache
+#and new bars extend every stored series with O(1) work per bar and window
+class IndicatorEngine:
+    def __init__(self, max_tickers=128):
+        self.max_tickers = max_tickers
+        self._state = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fresh(self, close):
+        values = close.to_numpy(dtype=float)
+        csum, count = _cumulative(values)
+        return {'index': close.index, 'values': values, 'csum': csum, 'count': count, 'sma': {}, 'ema': {}}
+
+    def _extend(self, state, close):
+        new = close.to_numpy(dtype=float)[len(state['values']):]
+        if not len(new):
+            return
+        n = len(state['values'])
+        values = np.concatenate([state['values'], new])
+        added_csum, added_count = _cumulative(new)
+        csum = np.concatenate([state['csum'], state['csum'][-1] + added_csum[1:]])
+        count = np.concatenate([state['count'], state['count'][-1] + added_count[1:]])
+        t = np.arange(n, len(values))
+        for w, ma in state['sma'].items():
+            added = np.full(len(new), np.nan)
+            full = (t >= w - 1) & (count[t+1] - count[np.maximum(t+1-w, 0)] == w)
+            added[full] = (csum[t[full]+1] - csum[t[full]+1-w]) / w
+            state['sma'][w] = np.concatenate([ma, added])
+        gap = _trailing_nans(state['values'])
+        for w, raw in state['ema'].items():
+            state['ema'][w] = np.concatenate([raw, ema(new, w, previous=raw[-1], gap=gap)])
+        state.update(index=close.index, values=values, csum=csum, count=count)
+
+    #an earlier series is reusable when the new one starts with exactly the same bars
+    def _reusable(self, state, close):
+        n = len(state['values'])
+        return (n <= len(close) and n > 0
+                and close.index[0] == state['index'][0] and close.index[n-1] == state['index'][-1]
+                and np.array_equal(close.iloc[n-1:n].to_numpy(dtype=float), state['values'][-1:], equal_nan=True))
+
+    def compute(self, ticker, close, sma_windows=(), ema_windows=()):
+        with self._lock:
+            state = self._state.get(ticker)
+            if state is None or not self._reusable(state, close):
+                state = self._fresh(close)
+            else:
+                self._extend(state, close)
+            self._state[ticker] = state
+            self._state.move_to_end(ticker)
+            while len(self._state) > self.max_tickers:
+                self._state.popitem(last=False)
+
+            for w in sma_windows:
+                if w not in state['sma']:
+                    state['sma'][w] = _sma_from_csum(state['csum'], state['count'], w)
+            for w in ema_windows:
+                if w not in state['ema']:
+                    state['ema'][w] = ema(state['values'], w)
+
+            columns = {sma_name(w): state['sma'][w] for w in sma_windows}
+            for w in ema_windows:
+                masked = state['ema'][w].copy()
+                masked[:w-1] = np.nan
+                columns[ema_name(w)] = masked
+        return pd.DataFrame(columns, index=close.index)
+
+_default_engine = IndicatorEngine()
+
+def default_engine():
+    return _default_engine
+
+#"20, 30" -> [20, 30], anything that isn't a positive integer is ignored
+def parse_windows(text):
+    windows = []
+    for part in text.replace(';', ',').split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) > 0 and int(part) not in windows:
+            windows.append(int(part))
+    return windows
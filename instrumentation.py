@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+
+# APP_INSTRUMENTATION=1 times every rerun, otherwise only sessions that tick the sidebar panel do
+ENABLED = os.environ.get('APP_INSTRUMENTATION', '') not in ('', '0')
+# json lines of every instrumented rerun are appended here when set
+LOG_PATH = os.environ.get('APP_INSTRUMENTATION_LOG')
+
+_local = threading.local()
+_lock = threading.Lock()
+# process wide totals per stage: [calls, seconds, max seconds]
+_stage_totals = {}
+_counters = {}
+
+class _Run:
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.stages = []
+
+def _current():
+    return getattr(_local, 'run', None)
+
+def enabled():
+    return _current() is not None
+
+#start timing a rerun on this thread, pages call it before any other work
+def begin_run(page, enable=None):
+    _local.run = _Run(page) if (ENABLED if enable is None else enable) else None
+    return _local.run is not None
+
+def _record(name, seconds):
+    run = _current()
+    run.stages.append((name, seconds))
+    with _lock:
+        totals = _stage_totals.setdefault(name, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+
+@contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+_NOOP = nullcontext()
+
+#with timer('model.predict'): ... costs one attribute lookup when the run isn't instrumented
+def timer(name):
+    if _current() is None:
+        return _NOOP
+    return _timed(name)
+
+def timed(name=None):
+    def decorate(func):
+        label = name or func.__qualname__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current() is None:
+                return func(*args, **kwargs)
+            with _timed(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+#process wide counters, cheap enough to stay on when timing is off
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def stages():
+    run = _current()
+    return list(run.stages) if run else []
+
+#stage breakdown of the current rerun, written to LOG_PATH when that is set
+def end_run():
+    run = _current()
+    if run is None:
+        return None
+    record = {
+        'ts': time.time(),
+        'page': run.page,
+        'total': time.perf_counter() - run.started,
+        'stages': [{'name': n, 'seconds': s} for n, s in run.stages],
+    }
+    if LOG_PATH:
+        with _lock, open(LOG_PATH, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    _local.run = None
+    return record
+
+def snapshot():
+    with _lock:
+        return {name: list(v) for name, v in _stage_totals.items()}, dict(_counters)
+
+#process totals in the prometheus text exposition format
+def prometheus_text():
+    totals, counters = snapshot()
+    lines = ['# TYPE app_stage_seconds_total counter',
+             *[f'app_stage_seconds_total{{stage="{n}"}} {v[1]:.6f}' for n, v in sorted(totals.items())],
+             '# TYPE app_stage_calls_total counter',
+             *[f'app_stage_calls_total{{stage="{n}"}} {v[0]}' for n, v in sorted(totals.items())],
+             '# TYPE app_stage_seconds_max gauge',
+             *[f'app_stage_seconds_max{{stage="{n}"}} {v[2]:.6f}' for n, v in sorted(totals.items())],
+             '# TYPE app_events_total counter',
+             *[f'app_events_total{{event="{n}"}} {v}' for n, v in sorted(counters.items())]]
+    return '\n'.join(lines) + '\n'
+
+#sidebar toggle plus begin_run, the panel itself is drawn by debug_panel at the end of the page
+def start_page(page):
+    import streamlit as st
+    show = st.sidebar.checkbox('Show timing panel', key='timing_panel')
+    begin_run(page, enable=ENABLED or show)
+    return show
+
+def debug_panel(show=True):
+    import streamlit as st
+    import pandas as pd
+    record = end_run()
+    if not show or record is None:
+        return
+    with st.sidebar.expander('Timing (this rerun)', expanded=True):
+        st.write(f"total {record['total']*1000:.0f} ms")
+        breakdown = pd.DataFrame(record['stages'], columns=['name', 'seconds'])
+        if len(breakdown):
+            breakdown = breakdown.groupby('name', sort=False)['seconds'].agg(['count', 'sum']).sort_values('sum', ascending=False)
+            breakdown['ms'] = (breakdown.pop('sum') * 1000).round(1)
+        st.dataframe(breakdown, use_container_width=True)
+        _, counters = snapshot()
+        if counters:
+            st.write(counters)
+        st.download_button('Export JSON', json.dumps(record), file_name='timing.json', mime='application/json')
+        st.download_button('Export Prometheus text', prometheus_text(), file_name='metrics.prom', mime='text/plain')
@@ -0,0 +1,133 @@
+import argparse
+import numpy as np
+
+DTYPE = np.float32
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1)
+
+def _relu(x):
+    return np.maximum(x, 0)
+
+def _linear(x):
+    return x
+
+ACTIVATIONS = {'sigmoid': _sigmoid, 'tanh': np.tanh, 'relu': _relu, 'linear': _linear}
+
+#forward pass of a keras Sequential made of LSTM layers followed by Dense layers
+#only numpy is needed at inference time, the weights come from export()
+class NumpyLSTMModel:
+    def __init__(self, lstm_layers, dense_layers):
+        # lstm: (kernel, recurrent_kernel, bias), gates in keras order i, f, c, o
+        self.lstm_layers = [tuple(np.asarray(w, dtype=DTYPE) for w in layer) for layer in lstm_layers]
+        # dense: (kernel, bias, activation name)
+        self.dense_layers = [(np.asarray(k, dtype=DTYPE), np.asarray(b, dtype=DTYPE), act) for k, b, act in dense_layers]
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        lstm_layers = [(data[f'lstm{i}_kernel'], data[f'lstm{i}_recurrent'], data[f'lstm{i}_bias'])
+                       for i in range(int(data['n_lstm']))]
+        dense_layers = [(data[f'dense{i}_kernel'], data[f'dense{i}_bias'], str(data[f'dense{i}_activation']))
+                        for i in range(int(data['n_dense']))]
+        return cls(lstm_layers, dense_layers)
+
+    def save(self, path):
+        arrays = {'n_lstm': len(self.lstm_layers), 'n_dense': len(self.dense_layers)}
+        for i, (kernel, recurrent, bias) in enumerate(self.lstm_layers):
+            arrays[f'lstm{i}_kernel'] = kernel
+            arrays[f'lstm{i}_recurrent'] = recurrent
+            arrays[f'lstm{i}_bias'] = bias
+        for i, (kernel, bias, activation) in enumerate(self.dense_layers):
+            arrays[f'dense{i}_kernel'] = kernel
+            arrays[f'dense{i}_bias'] = bias
+            arrays[f'dense{i}_activation'] = np.array(activation)
+        np.savez(path, **arrays)
+
+    #zero (h, c) for every lstm layer
+    def initial_state(self, n):
+        return [(np.zeros((n, r.shape[0]), dtype=DTYPE), np.zeros((n, r.shape[0]), dtype=DTYPE))
+                for _, r, _ in self.lstm_layers]
+
+    #advance every lstm layer by one timestep, x_t is (n, features)
+    def step(self, x_t, state):
+        new_state = []
+        h = x_t
+        for (kernel, recurrent, bias), (h_prev, c_prev) in zip(self.lstm_layers, state):
+            units = recurrent.shape[0]
+            z = h @ kernel + h_prev @ recurrent + bias
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2*units])
+            g = np.tanh(z[:, 2*units:3*units])
+            o = _sigmoid(z[:, 3*units:])
+            c = f * c_prev + i * g
+            h = o * np.tanh(c)
+            new_state.append((h, c))
+        return h, new_state
+
+    #dense head applied to the last lstm output
+    def head(self, h):
+        for kernel, bias, activation in self.dense_layers:
+            h = ACTIVATIONS[activation](h @ kernel + bias)
+        return h
+
+    def encode(self, x, state=None):
+        x = np.asarray(x, dtype=DTYPE)
+        if state is None:
+            state = self.initial_state(len(x))
+        h = None
+        for t in range(x.shape[1]):
+            h, state = self.step(x[:, t], state)
+        return h, state
+
+    #same call shape as keras Model.predict
+    def predict(self, x, batch_size=1024, verbose=0):
+        x = np.asarray(x, dtype=DTYPE)
+        out = [self.head(self.encode(x[i:i+batch_size])[0]) for i in range(0, len(x), batch_size)]
+        if not out:
+            return np.empty((0, self.dense_layers[-1][0].shape[1]), dtype=DTYPE)
+        return np.concatenate(out)
+
+#convert a .keras artifact into the .npz weights NumpyLSTMModel loads
+def export(keras_path, npz_path):
+    from tensorflow.keras.models import load_model # type: ignore
+    model = load_model(keras_path)
+    lstm_layers = []
+    dense_layers = []
+    for layer in model.layers:
+        config = layer.get_config()
+        kind = type(layer).__name__
+        if kind == 'LSTM' and not dense_layers:
+            if config['activation'] != 'tanh' or config['recurrent_activation'] != 'sigmoid':
+                raise ValueError(f'unsupported LSTM activations in {layer.name}')
+            lstm_layers.append(layer.get_weights())
+        elif kind == 'Dense':
+            kernel, bias = layer.get_weights()
+            dense_layers.append((kernel, bias, config['activation']))
+        else:
+            raise ValueError(f'unsupported layer {layer.name} ({kind})')
+    NumpyLSTMModel(lstm_layers, dense_layers).save(npz_path)
+    return model
+
+#largest absolute difference between keras and numpy outputs on random windows
+def parity(keras_model, numpy_model, n=256, window=100, seed=0):
+    x = np.random.default_rng(seed).random((n, window, 1), dtype=DTYPE)
+    expected = keras_model.predict(x, verbose=0)
+    return float(np.abs(expected - numpy_model.predict(x)).max())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a keras LSTM model to numpy weights.')
+    parser.add_argument('model', nargs='?', default='Latest_stock_price_model.keras')
+    parser.add_argument('--output', help='defaults to the model path with a .npz suffix')
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    args = parser.parse_args(argv)
+
+    output = args.output or args.model.rsplit('.', 1)[0] + '.npz'
+    keras_model = export(args.model, output)
+    diff = parity(keras_model, NumpyLSTMModel.load(output))
+    print(f'wrote {output}, max abs difference vs keras: {diff:.2e}')
+    if diff > args.tolerance:
+        raise SystemExit(f'parity check failed, {diff:.2e} > {args.tolerance:.0e}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import os
+import threading
+import numpy as np
+import instrumentation
+
+DEFAULT_MODEL = "Latest_stock_price_model.keras"
+BACKENDS = ('keras', 'numpy')
+# replicas can skip importing tensorflow entirely with STOCK_MODEL_BACKEND=numpy
+DEFAULT_BACKEND = os.environ.get('STOCK_MODEL_BACKEND', 'keras')
+if DEFAULT_BACKEND not in BACKENDS:
+    raise ValueError(f'STOCK_MODEL_BACKEND={DEFAULT_BACKEND!r} is not one of {BACKENDS}')
+WARMUP_SHAPE = (1, 100, 1)
+
+# models loaded in this server process, keyed by (absolute path, mtime)
+_models = {}
+_lock = threading.Lock()
+
+def _model_key(path):
+    path = os.path.abspath(path)
+    return path, os.path.getmtime(path)
+
+#the artifact a backend loads, the numpy backend reads the weights exported next to the .keras file
+def artifact_path(path=DEFAULT_MODEL, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f'unknown model backend {backend!r}, expected one of {BACKENDS}')
+    if backend == 'numpy':
+        return os.path.splitext(path)[0] + '.npz'
+    return path
+
+@instrumentation.timed('load_model')
+def _load(path):
+    instrumentation.count('model_registry.load')
+    if path.endswith('.npz'):
+        from lstm_numpy import NumpyLSTMModel
+        return NumpyLSTMModel.load(path)
+    from tensorflow.keras.models import load_model # type: ignore
+    return load_model(path)
+
+#load the model once per process, a new mtime means a redeployed artifact
+def get_model(path=DEFAULT_MODEL, warmup=True, backend=None):
+    key = _model_key(artifact_path(path, backend))
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = _load(key[0])
+            if warmup:
+                warm_model(model)
+            # drop older versions of the same file
+            for old in [k for k in _models if k[0] == key[0]]:
+                del _models[old]
+            _models[key] = model
+    return model
+
+#identifies the artifact version, changes whenever the file is redeployed
+def model_id(path=DEFAULT_MODEL, backend=None):
+    path, mtime = _model_key(artifact_path(path, backend))
+    return f'{os.path.basename(path)}@{mtime:.0f}'
+
+#run a dummy batch so the first real predict doesn't pay for graph tracing
+def warm_model(model, shape=WARMUP_SHAPE):
+    model.predict(np.zeros(shape, dtype=np.float32), verbose=0)
+
+#load every artifact up front, e.g. from a startup hook
+def preload(paths=(DEFAULT_MODEL,), warmup=True, backend=None):
+    for path in paths:
+        get_model(path, warmup=warmup, backend=backend)
+
+def clear():
+    with _lock:
+        _models.clear()
@@ -0,0 +1,208 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+YAHOO_RSS = 'https://feeds.finance.yahoo.com/rss/2.0/headline?s={}&region=US&lang=en-US'
+NEWS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'news.sqlite')
+# a feed checked more recently than this is not polled again
+MAX_AGE = 600
+COLUMNS = ['guid', 'title', 'summary', 'link', 'published']
+RSS_DATE = '%a, %d %b %Y %H:%M:%S %z'
+EPOCH = pd.Timestamp(0, tz='UTC')
+# background refreshes that may run at once across all watchlists
+MAX_REFRESHES = 8
+
+#all dates of a column at once, rss dates first and anything else through the mixed-format parser
+def parse_dates(values):
+    values = pd.Series(values, dtype=object)
+    parsed = pd.to_datetime(values, format=RSS_DATE, utc=True, errors='coerce')
+    missing = parsed.isna() & values.notna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(values[missing], format='mixed', utc=True, errors='coerce')
+    return parsed
+
+#feed fetchers take (stock, etag, modified) and return (etag, modified, entries)
+#entries is None when the feed answered 304 Not Modified
+def yahoo_feed(stock, etag=None, modified=None, session=None, timeout=10):
+    import requests
+    import feedparser
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if modified:
+        headers['If-Modified-Since'] = modified
+    response = (session or requests).get(YAHOO_RSS.format(stock), headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return etag, modified, None
+    response.raise_for_status()
+    feed = feedparser.parse(response.content)
+    entries = pd.DataFrame([{c: entry.get('id' if c == 'guid' else c) for c in COLUMNS} for entry in feed.entries],
+                           columns=COLUMNS)
+    return response.headers.get('ETag'), response.headers.get('Last-Modified'), entries
+
+#offline stand-in, serves canned entries per stock with an ETag that changes with the entries, records every request
+class LocalFeeds:
+    def __init__(self, feeds):
+        self.feeds = feeds
+        self.calls = []
+
+    def __call__(self, stock, etag=None, modified=None):
+        entries = self.feeds.get(stock.upper())
+        if entries is None:
+            raise KeyError(f'no feed for {stock}')
+        entries = pd.DataFrame(entries, columns=COLUMNS)
+        current = f'"{len(entries)}-{entries.guid.iloc[-1] if len(entries) else ""}"'
+        self.calls.append((stock, etag == current))
+        if etag == current:
+            return etag, modified, None
+        return current, None, entries
+
+#articles per stock in sqlite, one row per (stock, guid) so a re-polled feed adds nothing twice
+#plus the validators and last check time of every feed
+class NewsStore:
+    def __init__(self, path=NEWS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''CREATE TABLE IF NOT EXISTS articles (
+                stock TEXT NOT NULL, guid TEXT NOT NULL, title TEXT, summary TEXT, link TEXT,
+                published TEXT, published_ts INTEGER, fetched_ts REAL,
+                PRIMARY KEY (stock, guid))''')
+            db.execute('CREATE INDEX IF NOT EXISTS articles_by_date ON articles (stock, published_ts DESC)')
+            db.execute('''CREATE TABLE IF NOT EXISTS feeds (
+                stock TEXT PRIMARY KEY, etag TEXT, modified TEXT, checked_ts REAL)''')
+
+    #one short lived connection per call so any thread can use the store, committed on success
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    #inserts the entries that are new for the stock and returns how many were added
+    def add(self, stock, entries, fetched=None):
+        stock = stock.upper()
+        if entries is None or not len(entries):
+            return 0
+        entries = entries.reindex(columns=COLUMNS)
+        # feeds without guids still dedupe on their link
+        guid = entries.guid.where(entries.guid.notna(), entries.link)
+        entries = entries[guid.notna()].assign(guid=guid[guid.notna()])
+        published_ts = (parse_dates(entries.published) - EPOCH) // pd.Timedelta(seconds=1)
+        fetched = time.time() if fetched is None else fetched
+        rows = [(stock, g, t, s, l, p, None if pd.isna(ts) else int(ts), fetched)
+                for g, t, s, l, p, ts in zip(entries.guid, entries.title, entries.summary, entries.link,
+                                             entries.published, published_ts)]
+        with self._lock, self._connect() as db:
+            before = db.total_changes
+            db.executemany('INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            return db.total_changes - before
+
+    #newest articles first, published is a tz aware timestamp
+    def latest(self, stock, limit=10):
+        with self._connect() as db:
+            df = pd.read_sql_query(
+                'SELECT guid, title, summary, link, published, published_ts FROM articles '
+                'WHERE stock = ? ORDER BY published_ts DESC LIMIT ?', db, params=(stock.upper(), limit))
+        df['published'] = pd.to_datetime(df.pop('published_ts'), unit='s', utc=True)
+        return df
+
+    #every stored article of the stocks published at or after since (a timestamp), for batch processing
+    def articles(self, stocks, since=None):
+        stocks = [s.upper() for s in stocks]
+        query = f'SELECT stock, guid, title, summary, published_ts FROM articles WHERE stock IN ({",".join("?" * len(stocks))})'
+        params = list(stocks)
+        if since is not None:
+            query += ' AND published_ts >= ?'
+            since = pd.Timestamp(since)
+            params.append(int((since.tz_localize('UTC') if since.tzinfo is None else since).timestamp()))
+        with self._connect() as db:
+            df = pd.read_sql_query(query + ' AND published_ts IS NOT NULL', db, params=params)
+        df['published'] = pd.to_datetime(df.pop('published_ts'), unit='s', utc=True)
+        return df
+
+    def feed_state(self, stock):
+        with self._connect() as db:
+            row = db.execute('SELECT etag, modified, checked_ts FROM feeds WHERE stock = ?', (stock.upper(),)).fetchone()
+        return row or (None, None, None)
+
+    def set_feed_state(self, stock, etag, modified, checked=None):
+        with self._lock, self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?)',
+                       (stock.upper(), etag, modified, time.time() if checked is None else checked))
+
+    #stocks whose feed was never checked or was checked more than max_age seconds ago
+    def stale(self, stocks, max_age=MAX_AGE):
+        now = time.time()
+        return [s for s in stocks if (self.feed_state(s)[2] or 0) < now - max_age]
+
+#poll the feeds of many stocks at once, unchanged feeds only cost a conditional request
+#returns {stock: articles added}, with an errors dict a failing feed is recorded there instead of raising
+#a failed feed still counts as checked so it is retried after max_age rather than on every rerun
+def ingest(stocks, store, fetcher=yahoo_feed, max_workers=8, errors=None):
+    stocks = list(dict.fromkeys(s.upper() for s in stocks))
+    if not stocks:
+        return {}
+
+    def poll(stock):
+        etag, modified, _ = store.feed_state(stock)
+        try:
+            return stock, fetcher(stock, etag, modified), None
+        except Exception as e:
+            return stock, (etag, modified, None), e
+
+    added = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(stocks))) as pool:
+        for stock, (etag, modified, entries), error in pool.map(poll, stocks):
+            if error is None:
+                added[stock] = store.add(stock, entries)
+            store.set_feed_state(stock, etag, modified)
+            if error is not None:
+                if errors is None:
+                    raise error
+                errors[stock] = error
+    return added
+
+_default_store = None
+_default_lock = threading.Lock()
+
+def default_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = NewsStore()
+        return _default_store
+
+_refreshes = {}
+_refreshes_guard = threading.Lock()
+
+#poll the stale feeds of a watchlist on a daemon thread, one running refresh per watchlist
+#finished refreshes are forgotten, with max_running already polling no new one starts until a slot frees up
+def refresh_in_background(stocks, store=None, fetcher=yahoo_feed, max_age=MAX_AGE, max_running=MAX_REFRESHES):
+    store = store or default_store()
+    key = tuple(sorted(s.upper() for s in stocks))
+    with _refreshes_guard:
+        for done in [k for k, t in _refreshes.items() if not t.is_alive()]:
+            del _refreshes[done]
+        thread = _refreshes.get(key)
+        if thread is not None:
+            return thread
+        if len(_refreshes) >= max_running:
+            return None
+        stale = store.stale(key, max_age)
+        if not stale:
+            return None
+        thread = threading.Thread(target=ingest, args=(stale, store, fetcher), kwargs={'errors': {}}, daemon=True)
+        _refreshes[key] = thread
+        thread.start()
+        return thread
@@ -1,14 +1,18 @@
 import streamlit as st
-import yfinance as yf
-import plotly.express as px
-import numpy as np
 from datetime import datetime
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import pandas as pd
+import price_store
+import charting
+import fundamentals
+import risk_stats
+import instrumentation
 
 
 
 st.title('Stock Dashboard')
+show_timing = instrumentation.start_page('Fundamental')
 
 # About section
 expander_bar = st.expander("About")
@@ -33,7 +37,7 @@ start_date = st.sidebar.date_input('Start Date', datetime(2020, 1, 1))
 end_date = st.sidebar.date_input('End Date', datetime.now())
 
 # Download data
-data = yf.download(ticker, start=start_date, end=end_date)
+data = price_store.load_prices(ticker, start_date, end_date)
 
 # Create tabs
 pricing_data, fundamental_data = st.tabs(["Pricing Data", "Fundamental Data"])
@@ -46,9 +50,11 @@ with pricing_data:
     data2.dropna(inplace=True)
     st.dataframe(data2, use_container_width=True)
     
-    annual_return = data2['% Change'].mean() * 252 * 100
-    stdev = np.std(data2['% Change']) * np.sqrt(252) * 100
-    risk_adj_return = annual_return / stdev
+    with instrumentation.timer('risk stats'):
+        stats = risk_stats.summary(data2['% Change']).iloc[0]
+    annual_return = stats['annual_return']
+    stdev = stats['stdev']
+    risk_adj_return = stats['risk_adj_return']
 
     # Styling for the statistics
     st.markdown("""
@@ -105,6 +111,31 @@ with pricing_data:
 
     st.markdown("<br><br>", unsafe_allow_html=True)
 
+    # Rolling risk statistics
+    st.subheader('Rolling Risk Statistics')
+    rolling_window = st.selectbox('Rolling window (trading days)', [21, 63, 126, 252], index=1)
+    with instrumentation.timer('risk stats'):
+        rolling_stats = risk_stats.rolling(data2['% Change'], rolling_window)
+    fig_rolling = make_subplots(rows=3, cols=1, shared_xaxes=True,
+                                subplot_titles=('Sharpe Ratio', 'Volatility (%)', 'Max Drawdown (%)'))
+    fig_rolling.add_trace(charting.line_trace(data2.index, rolling_stats['sharpe'].iloc[:, 0], 'Sharpe'), row=1, col=1)
+    fig_rolling.add_trace(charting.line_trace(data2.index, rolling_stats['volatility'].iloc[:, 0], 'Volatility'), row=2, col=1)
+    fig_rolling.add_trace(charting.line_trace(data2.index, rolling_stats['max_drawdown'].iloc[:, 0] * 100, 'Max Drawdown'), row=3, col=1)
+    fig_rolling.update_layout(height=600, showlegend=False)
+    with instrumentation.timer('plotly'):
+        st.plotly_chart(fig_rolling)
+
+    # Rank a watchlist on the same statistics
+    with st.expander('Watchlist Risk Ranking'):
+        watchlist = st.text_input('Tickers (comma separated)', 'GOOG, AAPL, MSFT, AMZN, TSLA')
+        rank_by = st.selectbox('Rank by', ['risk_adj_return', 'annual_return', 'stdev', 'max_drawdown'])
+        symbols = [t.strip().upper() for t in watchlist.split(',') if t.strip()]
+        # expander bodies run on every rerun even when collapsed, so prices only load once asked for
+        if symbols and st.checkbox('Load watchlist prices', key='load_watchlist'):
+            with instrumentation.timer('yf.download'):
+                watchlist_prices = price_store.load_close_frame(symbols, start_date, end_date)
+            st.dataframe(risk_stats.rank(risk_stats.daily_returns(watchlist_prices), rank_by), use_container_width=True)
+
     # Create two columns for buttons
     col1, col2, col3, col4, col5 = st.columns(5)
 
@@ -113,10 +144,10 @@ with pricing_data:
         # Create bar graph of % Change
         st.subheader('Daily Percentage Change')
         fig_bar = go.Figure()
-        fig_bar.add_trace(go.Bar(
-            x=data2.index,
-            y=data2['% Change'] * 100,  # Convert to percentage
-            name='Daily % Change'
+        fig_bar.add_trace(charting.bar_trace(
+            data2.index,
+            data2['% Change'] * 100,  # Convert to percentage
+            'Daily % Change'
             ))
         fig_bar.update_layout(
             title=f'{ticker} Daily Percentage Change',
@@ -124,17 +155,18 @@ with pricing_data:
             yaxis_title='Percentage Change (%)',
             barmode='relative'
             )
-        st.plotly_chart(fig_bar)
+        with instrumentation.timer('plotly'):
+            st.plotly_chart(fig_bar)
 
         # Button to show the volume graph
     if col5.button('Show Volume Graph'):
         # Create bar graph of Volume
         st.subheader('Daily Trading Volume')
         fig_volume = go.Figure()
-        fig_volume.add_trace(go.Bar(
-                x=data.index,
-                y=data['Volume'],
-                name='Volume'
+        fig_volume.add_trace(charting.bar_trace(
+                data.index,
+                data['Volume'],
+                'Volume'
             ))
         fig_volume.update_layout(
                 title=f'{ticker} Daily Trading Volume',
@@ -142,35 +174,47 @@ with pricing_data:
                 yaxis_title='Volume',
                 barmode='relative'
             )
-        st.plotly_chart(fig_volume)
+        with instrumentation.timer('plotly'):
+            st.plotly_chart(fig_volume)
 
 
 with fundamental_data:
-    st.subheader(f'Overview of {ticker}')
-    try:
-        stock = yf.Ticker(ticker)
-        overview_data = pd.DataFrame.from_dict(stock.info, orient='index', columns=[ticker])
-        st.dataframe(overview_data, use_container_width=True)
-    except Exception as e:
-        st.error(f"Error fetching overview data: {e}")
-
-    st.subheader('Balance Sheet')
-    try:
-        balance_sheet = stock.balance_sheet
-        st.dataframe(balance_sheet, use_container_width=True)
-    except Exception as e:
-        st.error(f"Error fetching balance sheet data: {e}")
-
-    st.subheader('Income Statement')
-    try:
-        income_statement = stock.financials
-        st.dataframe(income_statement, use_container_width=True)
-    except Exception as e:
-        st.error(f"Error fetching income statement data: {e}")
-
-    st.subheader('Cash Flow Statement')
-    try:
-        cash_flow = stock.cashflow
-        st.dataframe(cash_flow, use_container_width=True)
-    except Exception as e:
-        st.error(f"Error fetching cash flow data: {e}")
\ No newline at end of file
+    # Streamlit runs every tab on each rerun, so the remote calls wait until they are asked for
+    if not st.checkbox('Load fundamental data', key='load_fundamentals'):
+        st.info('Tick "Load fundamental data" to fetch the overview and financial statements.')
+    else:
+        with instrumentation.timer('fundamentals'):
+            statements = fundamentals.load(ticker)
+
+        st.subheader(f'Overview of {ticker}')
+        try:
+            overview_data = pd.DataFrame.from_dict(statements.get('info'), orient='index', columns=[ticker])
+            st.dataframe(overview_data, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error fetching overview data: {e}")
+
+        st.subheader('Balance Sheet')
+        try:
+            balance_sheet = statements.get('balance_sheet')
+            st.dataframe(balance_sheet, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error fetching balance sheet data: {e}")
+
+        st.subheader('Income Statement')
+        try:
+            income_statement = statements.get('financials')
+            st.dataframe(income_statement, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error fetching income statement data: {e}")
+
+        st.subheader('Cash Flow Statement')
+        try:
+            cash_flow = statements.get('cashflow')
+            st.dataframe(cash_flow, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error fetching cash flow data: {e}")
+
+        with st.expander('Load timings'):
+            st.dataframe(pd.Series(statements.timings, name='seconds'), use_container_width=True)
+
+instrumentation.debug_panel(show_timing)
@@ -1,9 +1,10 @@
 import streamlit as st
 import  pandas  as pd
-import yfinance as yf
 import datetime
-import pandas_datareader.data as web
 import capm_func as capm_func
+import price_store
+import data_access
+import instrumentation
 
 
 
@@ -13,6 +14,7 @@ st.set_page_config(page_title = "CAPM",
 
 
 st.title("Capital Asset Pricing Management")
+show_timing = instrumentation.start_page("CAPM")
 #getting input
 
 col1,col2 = st.columns([1,1])
@@ -26,21 +28,18 @@ try:
     # Downloading data for SP500
     end = datetime.date.today()
     start = datetime.date(datetime.date.today().year-year, datetime.date.today().month, datetime.date.today().day)
-    SP500 = web.DataReader(['sp500'],'fred',start,end)
+    with instrumentation.timer('fred'):
+        SP500 = data_access.fred(['sp500'],start,end)
 
-    stocks_df = pd.DataFrame()
-    for stock in stocks_list:
-        data = yf.download(stock, period = f'{year}y')
-        stocks_df[f'{stock}'] = data['Close']
+    with instrumentation.timer('yf.download'):
+        stocks_df = price_store.load_close_frame(stocks_list, start, end)
+    stocks_df.index = stocks_df.index.normalize()
+    SP500.index = pd.DatetimeIndex(SP500.index).normalize()
+    SP500.columns = ['sp500']
 
+    stocks_df = stocks_df.join(SP500, how = 'inner')
+    stocks_df.index.name = 'Date'
     stocks_df.reset_index(inplace = True)
-    SP500.reset_index(inplace = True)
-    SP500.columns = ['Date','sp500']
-
-    stocks_df['Date'] = stocks_df['Date'].astype('datetime64[ns]')
-    stocks_df['Date'] = stocks_df['Date'].apply(lambda x:str(x)[:10])
-    stocks_df['Date'] = pd.to_datetime(stocks_df['Date'])
-    stocks_df = pd.merge(stocks_df, SP500,on = 'Date', how = 'inner')
 
     col1, col2 = st.columns([1,1])
     with col1:
@@ -53,21 +52,19 @@ try:
     col1, col2 = st.columns([1,1])
     with col1:
         st.markdown("### Price of all the Stocks")
-        st.plotly_chart(capm_func.interactive_plot(stocks_df))
+        with instrumentation.timer('plotly'):
+            st.plotly_chart(capm_func.interactive_plot(stocks_df))
     with col2:
         st.markdown("### Price of all the Stocks after normalizing")
-        st.plotly_chart(capm_func.interactive_plot(capm_func.normalize(stocks_df)))
+        with instrumentation.timer('plotly'):
+            st.plotly_chart(capm_func.interactive_plot(capm_func.normalize(stocks_df)))
 
     stocks_daily_return = capm_func.daily_return(stocks_df)
 
-    beta = {}
-    alpha = {}
-
-    for i in stocks_daily_return.columns:
-        if i != 'Date' and i != 'sp500':
-            b, a = capm_func.calculate_beta(stocks_daily_return, i)
-            beta[i] = b
-            alpha[i] = a
+    with instrumentation.timer('betas'):
+        beta, alpha = capm_func.calculate_betas(stocks_daily_return)
+    beta = beta.to_dict()
+    alpha = alpha.to_dict()
 
     beta_df = pd.DataFrame(columns=['Stock','Beta Value'])
     beta_df['Stock'] = beta.keys()
@@ -93,3 +90,5 @@ try:
 
 except:
     st.write("Please select valid input")
+
+instrumentation.debug_panel(show_timing)
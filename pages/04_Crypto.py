@@ -2,19 +2,20 @@ import streamlit as st
 import pandas as pd
 import base64
 import plotly.graph_objects as go
-import requests
-import json
+import data_access
+import instrumentation
 
 st.set_page_config(layout="wide")
 
 st.title('Crypto Price')
+show_timing = instrumentation.start_page('Crypto')
 st.markdown("""
-This app retrieves cryptocurrency prices for the top 100 cryptocurrencies from CoinGecko!
+This app retrieves cryptocurrency prices for the top cryptocurrencies from CoinGecko!
 """)
 
 expander_bar = st.expander("About")
 expander_bar.markdown("""
-* **Python libraries:** base64, pandas, streamlit, plotly, requests, json
+* **Python libraries:** base64, pandas, streamlit, plotly, requests
 * **Data source:** [CoinGecko](https://www.coingecko.com/).
 """)
 
@@ -25,23 +26,10 @@ col1.header('Input Options')
 
 # Sidebar - Currency price unit
 currency_price_unit = col1.selectbox('Select currency for price', ['usd', 'btc', 'eth'])
+coins_tracked = col1.selectbox('Coins to track', [100, 250, 500, 1000])
 
-@st.cache_data
-def load_data():
-    url = "https://api.coingecko.com/api/v3/coins/markets"
-    params = {
-        "vs_currency": currency_price_unit,
-        "order": "market_cap_desc",
-        "per_page": 100,
-        "page": 1,
-        "sparkline": False,
-        "price_change_percentage": "1h,24h,7d"
-    }
-    
-    response = requests.get(url, params=params)
-    data = response.json()
-    
-    df = pd.DataFrame(data)
+def load_data(currency, coins):
+    df = data_access.crypto_markets(currency, coins)
     df = df.rename(columns={
         "id": "coin_name",
         "symbol": "coin_symbol",
@@ -55,7 +43,8 @@ def load_data():
     
     return df[["coin_name", "coin_symbol", "market_cap", "percent_change_1h", "percent_change_24h", "percent_change_7d", "price", "volume_24h"]]
 
-df = load_data()
+with instrumentation.timer('coingecko'):
+    df = load_data(currency_price_unit, coins_tracked)
 
 ## Sidebar - Cryptocurrency selections
 sorted_coin = sorted(df['coin_symbol'])
@@ -64,7 +53,7 @@ selected_coin = col1.multiselect('Cryptocurrency', sorted_coin, sorted_coin)
 df_selected_coin = df[df['coin_symbol'].isin(selected_coin)]
 
 ## Sidebar - Number of coins to display
-num_coin = col1.slider('Display Top N Coins', 1, 100, 100)
+num_coin = col1.slider('Display Top N Coins', 1, max(len(df), 1), min(len(df), 100))
 df_coins = df_selected_coin.head(num_coin)
 
 ## Sidebar - Percent change timeframe
@@ -127,16 +116,21 @@ if percent_timeframe == '7d':
         df_change = df_change.sort_values(by=['percent_change_7d'])
     col3.write('*7 days period*')
     fig = create_plotly_bar(df_change, 'percent_change_7d', '7 Days Percent Change')
-    col3.plotly_chart(fig, use_container_width=True)
+    with instrumentation.timer('plotly'):
+        col3.plotly_chart(fig, use_container_width=True)
 elif percent_timeframe == '24h':
     if sort_values == 'Yes':
         df_change = df_change.sort_values(by=['percent_change_24h'])
     col3.write('*24 hour period*')
     fig = create_plotly_bar(df_change, 'percent_change_24h', '24 Hours Percent Change')
-    col3.plotly_chart(fig, use_container_width=True)
+    with instrumentation.timer('plotly'):
+        col3.plotly_chart(fig, use_container_width=True)
 else:
     if sort_values == 'Yes':
         df_change = df_change.sort_values(by=['percent_change_1h'])
     col3.write('*1 hour period*')
     fig = create_plotly_bar(df_change, 'percent_change_1h', '1 Hour Percent Change')
-    col3.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    with instrumentation.timer('plotly'):
+        col3.plotly_chart(fig, use_container_width=True)
+
+instrumentation.debug_panel(show_timing)
@@ -1,8 +1,6 @@
-from stocknews import StockNews
 import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import datetime
+import news_store
+import instrumentation
 
 # Custom CSS for the card style
 st.markdown("""
@@ -33,35 +31,43 @@ st.markdown("""
 
 # News section
 st.title("News")
+show_timing = instrumentation.start_page("News")
 
 # About section
 expander_bar = st.expander("About")
 expander_bar.markdown("""
-* **Python libraries:** streamlit, stocknews, pandas, numpy
-* **Data source:** RSS feeds via StockNews library
+* **Python libraries:** streamlit, feedparser, requests, pandas, sqlite3
+* **Data source:** Yahoo Finance RSS feeds, kept in a local news store
 * This app provides the latest news for a given stock ticker:
     - Users can input any stock ticker symbol
     - Displays up to 10 most recent news articles related to the stock
     - Each news item includes the title, publication date, and a summary
+    - Feeds of the sidebar watchlist are polled in the background at most every 10 minutes
 * The app aims to keep investors informed about the latest developments affecting their chosen stocks.
 """)
 
-ticker = st.text_input("Enter the Stock ID", "GOOG")
+ticker = st.text_input("Enter the Stock ID", "GOOG").strip().upper()
+watchlist = [t.strip().upper() for t in st.sidebar.text_input('Watchlist', 'GOOG, AAPL, MSFT, AMZN, TSLA').split(',') if t.strip()]
 
 st.header(f'News of {ticker}')
-sn = StockNews(ticker, save_news=False)
-df_news = sn.read_rss()
+store = news_store.default_store()
+with instrumentation.timer('news'):
+    # the first visit of a ticker waits for its feed, after that the store answers and feeds refresh in the background
+    if st.sidebar.button('Refresh now') or store.feed_state(ticker)[2] is None:
+        news_store.ingest([ticker], store, errors={})
+    news_store.refresh_in_background([ticker] + watchlist, store)
+    df_news = store.latest(ticker, limit=10)
 
-def format_date(date_str):
-    dt = datetime.strptime(date_str, "%a, %d %b %Y %H:%M:%S %z")
-    return dt.strftime("%a, %d %b %Y %H:%M:%S")
+published = df_news['published'].dt.strftime("%a, %d %b %Y %H:%M:%S UTC").fillna('')
 
-for i in range(min(10, len(df_news))):
+for i in range(len(df_news)):
     with st.container():
         st.markdown(f"""
             <div class="news-card">
                 <div class="news-title">{df_news['title'][i]}</div>
-                <div class="news-date">{format_date(df_news['published'][i])}</div>
+                <div class="news-date">{published[i]}</div>
                 <div class="news-summary">{df_news['summary'][i]}</div>
             </div>
         """, unsafe_allow_html=True)
+
+instrumentation.debug_panel(show_timing)
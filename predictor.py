@@ -0,0 +1,385 @@
+import os
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import price_store
+import instrumentation
+from windowing import make_xy
+
+WINDOW = 100
+SPLIT = 0.7
+BATCH_SIZE = 4096
+# the model computes in float32, keeping prices and windows in it halves their memory
+DTYPE = np.float32
+PREDICTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'predictions')
+
+def _min_max_scaler():
+    from sklearn.preprocessing import MinMaxScaler
+    return MinMaxScaler(feature_range=(0,1))
+
+@instrumentation.timed('model.predict')
+def _predict(model, x, **kwargs):
+    return model.predict(x, verbose=0, **kwargs)
+
+#contiguous float32 batches filled from the window views of one or more series
+#only one batch of windows is materialised at a time, never the whole (N, window, 1) tensor
+def _batches(views, batch_size):
+    batch_size = min(batch_size, sum(len(v) for v in views))
+    buffer = None
+    filled = 0
+    for view in views:
+        pos = 0
+        while pos < len(view):
+            if buffer is None:
+                buffer = np.empty((batch_size,) + view.shape[1:], dtype=DTYPE)
+            take = min(batch_size - filled, len(view) - pos)
+            buffer[filled:filled+take] = view[pos:pos+take]
+            filled += take
+            pos += take
+            if filled == batch_size:
+                yield buffer
+                filled = 0
+    if filled:
+        yield buffer[:filled]
+
+#predictions for the windows of every view, in order, one (n, 1) float32 array
+def _predict_views(model, views, batch_size=BATCH_SIZE):
+    out = [np.asarray(_predict(model, batch, batch_size=batch_size), dtype=DTYPE).reshape(-1, 1)
+           for batch in _batches(views, batch_size)]
+    return np.concatenate(out) if out else np.empty((0, 1), dtype=DTYPE)
+
+#scaled test windows for one series, same 70-30 split and scaling as the prediction page
+@instrumentation.timed('windows')
+def prepare_series(close, window=WINDOW, split=SPLIT):
+    close = np.asarray(close, dtype=DTYPE).reshape(-1, 1)
+    splitting_len = int(len(close)*split)
+    scaler = _min_max_scaler()
+    scaled_data = scaler.fit_transform(close[splitting_len:])
+    x_data, y_data = make_xy(scaled_data, window)
+    return scaler, x_data, y_data, splitting_len
+
+#predict many tickers with one model.predict pass over all their stacked windows
+#frames is {ticker: bars}, result has one row per predicted day
+def predict_frames(frames, model, column='Close', window=WINDOW, split=SPLIT, batch_size=BATCH_SIZE):
+    prepared = {}
+    for ticker, df in frames.items():
+        if df is None or column not in df or len(df) == 0:
+            continue
+        scaler, x_data, _, splitting_len = prepare_series(df[column], window, split)
+        if len(x_data):
+            prepared[ticker] = (scaler, x_data, df[column], splitting_len+window)
+
+    columns = ['ticker', 'original_test_data', 'predictions']
+    if not prepared:
+        return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name='Date'))
+
+    # windows of every ticker go through the model together, batches span ticker boundaries
+    predictions = _predict_views(model, [p[1] for p in prepared.values()], batch_size)
+
+    results = []
+    offset = 0
+    for ticker, (scaler, x_data, close, first) in prepared.items():
+        pred = predictions[offset:offset+len(x_data)]
+        offset += len(x_data)
+        results.append(pd.DataFrame(
+            {
+                'ticker': ticker,
+                'original_test_data': close.to_numpy(dtype=DTYPE)[first:],
+                'predictions': scaler.inverse_transform(pred).reshape(-1)
+            },
+            index = close.index[first:]
+        ))
+    return pd.concat(results)
+
+#persists scaler parameters and predictions per ticker so a refresh only scores windows newer than the last stored date
+#the scaler stays frozen at the values fitted on the first run while later bars stay inside its range,
+#a close outside it would feed the model inputs beyond [0, 1] so everything is rebuilt with a new fit
+#a bar whose close was revised since it was stored (a partial intraday bar that later closed) is scored again
+class IncrementalPredictor:
+    def __init__(self, root=PREDICTION_DIR, column='Close', window=WINDOW, split=SPLIT):
+        self.root = root
+        self.column = column
+        self.window = window
+        self.split = split
+
+    def _paths(self, ticker):
+        name = os.path.join(self.root, price_store.safe_name(ticker))
+        return name + '.json', name + '.parquet'
+
+    def _read(self, ticker):
+        meta_path, data_path = self._paths(ticker)
+        if not (os.path.exists(meta_path) and os.path.exists(data_path)):
+            return None, None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return meta, pd.read_parquet(data_path)
+
+    #both files are written next to their targets and moved over them, a reader never sees a partial file
+    def _write(self, ticker, meta, predictions):
+        os.makedirs(self.root, exist_ok=True)
+        meta_path, data_path = self._paths(ticker)
+        predictions.to_parquet(data_path + '.tmp')
+        os.replace(data_path + '.tmp', data_path)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _scaler(self, meta):
+        scaler = _min_max_scaler()
+        scaler.fit(np.array([[meta['data_min']], [meta['data_max']]], dtype=DTYPE))
+        return scaler
+
+    def _full(self, df, model):
+        scaler, x_data, _, splitting_len = prepare_series(df[self.column], self.window, self.split)
+        pred = _predict_views(model, [x_data])
+        # a history too short for one test window has no predictions yet, the scaler rejects an empty array
+        predictions = pd.DataFrame(
+            {
+                'original_test_data': df[self.column].to_numpy(dtype=DTYPE)[splitting_len+self.window:],
+                'predictions': (scaler.inverse_transform(pred) if len(pred) else pred).reshape(-1)
+            },
+            index = df.index[splitting_len+self.window:]
+        )
+        meta = {
+            'split_date': str(df.index[splitting_len]),
+            'data_min': float(scaler.data_min_[0]),
+            'data_max': float(scaler.data_max_[0]),
+        }
+        return meta, predictions
+
+    #closes since the split still inside the range the stored scaler was fitted on
+    def _in_range(self, df, meta):
+        close = df[self.column].loc[pd.Timestamp(meta['split_date']):].to_numpy(dtype=DTYPE)
+        return bool(close.min() >= DTYPE(meta['data_min']) and close.max() <= DTYPE(meta['data_max']))
+
+    #stored rows before the first bar whose close no longer matches the data, e.g. an intraday bar that has since closed
+    #rows from there on used the old close as a target or inside their window and are scored again
+    def _unchanged(self, df, predictions):
+        close = df[self.column].reindex(predictions.index).to_numpy(dtype=DTYPE)
+        changed = np.flatnonzero(close != predictions['original_test_data'].to_numpy(dtype=DTYPE))
+        return predictions if not len(changed) else predictions.iloc[:changed[0]]
+
+    def _delta(self, df, model, meta, predictions):
+        close = df[self.column].to_numpy(dtype=DTYPE).reshape(-1, 1)
+        last_pos = df.index.get_loc(predictions.index[-1])
+        if last_pos == len(df) - 1:
+            return predictions
+        scaler = self._scaler(meta)
+        # each new target needs the window ending just before it, all inside the test span
+        first = last_pos + 1
+        scaled = scaler.transform(close[first-self.window:])
+        x_data, _ = make_xy(scaled, self.window)
+        pred = _predict_views(model, [x_data])
+        new = pd.DataFrame(
+            {
+                'original_test_data': close[first:].reshape(-1),
+                'predictions': scaler.inverse_transform(pred).reshape(-1)
+            },
+            index = df.index[first:]
+        )
+        return pd.concat([predictions, new])
+
+    #returns (predictions over the test span, forecast for the day after the last bar)
+    def update(self, ticker, df, model, model_id=None):
+        meta, predictions = self._read(ticker)
+        reusable = (
+            meta is not None and len(predictions) > 0
+            and meta.get('model_id') == model_id
+            and pd.Timestamp(meta['split_date']) in df.index
+            and predictions.index[-1] in df.index
+            and self._in_range(df, meta)
+        )
+        if reusable:
+            kept = self._unchanged(df, predictions)
+            reusable = len(kept) > 0
+        if reusable:
+            updated = self._delta(df, model, meta, kept)
+        else:
+            meta, updated = self._full(df, model)
+            meta['model_id'] = model_id
+        if updated is not predictions:
+            self._write(ticker, meta, updated)
+        return updated, self.forecast(df, model, meta)
+
+    #one step ahead prediction from the latest window
+    def forecast(self, df, model, meta):
+        close = df[self.column].to_numpy(dtype=DTYPE)[-self.window:].reshape(-1, 1)
+        if len(close) < self.window:
+            return None
+        scaler = self._scaler(meta)
+        pred = _predict(model, scaler.transform(close)[None])
+        return float(scaler.inverse_transform(pred)[0, 0])
+
+#scaled paths of horizon steps for (n, window, 1) scaled windows, every step is fed back as the next input
+#'state' encodes each window once and then advances the carried lstm state by one step per day, which needs
+#a model with step()/head() (the numpy backend); the newest input is added without dropping the oldest
+#'window' re-encodes the last window full length every step, exact for any model, horizon times the work
+def forecast_windows(model, windows, horizon=30, mode='state', batch_size=BATCH_SIZE):
+    windows = np.asarray(windows, dtype=DTYPE)
+    n, window = windows.shape[:2]
+    paths = np.empty((n, horizon), dtype=DTYPE)
+    if mode not in ('state', 'window'):
+        raise ValueError(f'unknown forecast mode {mode!r}')
+    if mode == 'state' and not hasattr(model, 'step'):
+        mode = 'window'
+    for lo in range(0, n, batch_size):
+        chunk = windows[lo:lo+batch_size]
+        if mode == 'state':
+            h, state = model.encode(chunk)
+            for t in range(horizon):
+                y = model.head(h)
+                paths[lo:lo+len(chunk), t] = y[:, 0]
+                if t + 1 < horizon:
+                    h, state = model.step(y, state)
+        else:
+            # windows followed by the predictions so far, the input of step t is the view buffer[:, t:t+window]
+            buffer = np.empty((len(chunk), window + horizon, windows.shape[2]), dtype=DTYPE)
+            buffer[:, :window] = chunk
+            for t in range(horizon):
+                y = np.asarray(_predict(model, buffer[:, t:t+window], batch_size=batch_size), dtype=DTYPE)
+                buffer[:, window+t] = y
+                paths[lo:lo+len(chunk), t] = y[:, 0]
+    return paths
+
+#horizon x ticker frame of forecast closes, rolled forward from the last window of every series at once
+#each ticker is scaled with the range of its test split, like prepare_series
+@instrumentation.timed('forecast')
+def forecast_frames(frames, model, horizon=30, mode='state', column='Close', window=WINDOW, split=SPLIT,
+                    batch_size=BATCH_SIZE):
+    tickers, windows, ranges = [], [], []
+    for ticker, df in frames.items():
+        if df is None or column not in df or len(df) < window:
+            continue
+        close = df[column].to_numpy(dtype=DTYPE)
+        test = close[int(len(close)*split):]
+        lo, hi = test.min(), test.max()
+        scale = (hi - lo) or DTYPE(1)
+        tickers.append(ticker)
+        windows.append((close[-window:] - lo) / scale)
+        ranges.append((lo, scale))
+    index = pd.RangeIndex(1, horizon + 1, name='horizon')
+    if not tickers:
+        return pd.DataFrame(index=index)
+    paths = forecast_windows(model, np.stack(windows)[:, :, None], horizon, mode, batch_size)
+    lo, scale = np.array(ranges, dtype=DTYPE).T
+    return pd.DataFrame((paths * scale[:, None] + lo[:, None]).T, index=index, columns=tickers)
+
+#fetch -> scale -> window -> predict -> inverse transform for a ticker list
+def predict_many(tickers, start, end, model=None, store=None, batch_size=BATCH_SIZE, errors=None):
+    if model is None:
+        import model_registry
+        model = model_registry.get_model()
+    frames = price_store.load_many(tickers, start, end, store=store, errors=errors, columns=['Close'])
+    return predict_frames(frames, model, batch_size=batch_size)
+
+# model of a pool worker process, loaded once by the initializer
+_worker_model = None
+
+def _init_worker(model_path, backend):
+    global _worker_model
+    import model_registry
+    _worker_model = model_registry.get_model(model_path, warmup=False, backend=backend)
+
+#every ticker of the chunk ends up in the results or in the errors, including the ones with no or too few bars
+def _score_chunk(tickers, start, end, batch_size):
+    errors = {}
+    frames = price_store.load_many(tickers, start, end, errors=errors, columns=['Close'])
+    results = predict_frames(frames, _worker_model, batch_size=batch_size)
+    errors = {t: repr(e) for t, e in errors.items()}
+    scored = set(results['ticker'])
+    for ticker in tickers:
+        if ticker in scored or ticker in errors:
+            continue
+        df = frames.get(ticker)
+        if df is None or 'Close' not in df or not len(df):
+            errors[ticker] = 'no price data'
+        else:
+            errors[ticker] = f'not enough history: {len(df)} bars leave no {WINDOW} day test window'
+    return results, errors
+
+#split the tickers into chunks and score them in worker processes, each worker loads the model once
+#returns the combined results and {ticker: error} for every ticker that has no predictions
+#one worker scores in a thread of this process, with the same per chunk error handling as the pool
+def predict_parallel(tickers, start, end, workers=4, chunk_size=25, model_path='Latest_stock_price_model.keras',
+                     backend=None, batch_size=BATCH_SIZE):
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[i:i+chunk_size] for i in range(0, len(tickers), chunk_size)]
+    errors = {}
+    parts = []
+    if workers <= 1:
+        pool = ThreadPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(model_path, backend))
+    else:
+        # spawn so workers don't inherit tensorflow or thread state from the parent
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(model_path, backend))
+    with pool:
+        futures = [pool.submit(_score_chunk, chunk, start, end, batch_size) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                results, chunk_errors = future.result()
+            except Exception as e:
+                results, chunk_errors = None, {t: repr(e) for t in chunk}
+            if results is not None:
+                parts.append(results)
+            errors.update(chunk_errors)
+    parts = [p for p in parts if len(p)]
+    results = pd.concat(parts) if parts else pd.DataFrame(columns=['ticker', 'original_test_data', 'predictions'])
+    return results, errors
+
+def write_results(results, path):
+    if path.endswith('.parquet'):
+        results.to_parquet(path)
+    else:
+        results.to_csv(path)
+
+def main(argv=None):
+    import model_registry
+    parser = argparse.ArgumentParser(description='Score many tickers with the stock price model.')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--tickers', nargs='+', help='ticker symbols')
+    group.add_argument('--file', help='file with one ticker per line')
+    group.add_argument('--sp500', action='store_true', help='score the S&P 500 universe')
+    parser.add_argument('--years', type=int, default=20, help='years of history to load')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--model', default='Latest_stock_price_model.keras')
+    parser.add_argument('--backend', choices=model_registry.BACKENDS, help='inference backend, defaults to STOCK_MODEL_BACKEND or keras')
+    parser.add_argument('--output', default='predictions.csv', help='.csv or .parquet')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes, 1 scores in this process')
+    parser.add_argument('--chunk-size', type=int, default=25, help='tickers per worker task')
+    parser.add_argument('--horizon', type=int, help='write an N day forecast per ticker instead of test split predictions')
+    parser.add_argument('--mode', choices=('state', 'window'), default='state', help='forecast rollout, see forecast_windows')
+    args = parser.parse_args(argv)
+
+    import universe
+    if args.sp500:
+        tickers = universe.sp500_symbols()
+    elif args.file:
+        tickers = universe.read_ticker_file(args.file)
+    else:
+        tickers = args.tickers
+
+    end = datetime.now()
+    start = datetime(end.year-args.years, end.month, end.day)
+    if args.horizon:
+        errors = {}
+        model = model_registry.get_model(args.model, warmup=False, backend=args.backend)
+        frames = price_store.load_many(tickers, start, end, errors=errors, columns=['Close'])
+        paths = forecast_frames(frames, model, args.horizon, args.mode, batch_size=args.batch_size)
+        write_results(paths, args.output)
+        print(f"wrote {args.horizon} day forecasts for {paths.shape[1]} tickers to {args.output}")
+        for ticker, error in errors.items():
+            print(f"skipped {ticker}: {error!r}")
+        return
+    results, errors = predict_parallel(tickers, start, end, workers=args.workers, chunk_size=args.chunk_size,
+                                       model_path=args.model, backend=args.backend, batch_size=args.batch_size)
+    write_results(results, args.output)
+    print(f"wrote {len(results)} predictions for {results['ticker'].nunique()} tickers to {args.output}")
+    for ticker, error in errors.items():
+        print(f"skipped {ticker}: {error}")
+
+if __name__ == '__main__':
+    main()
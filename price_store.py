@@ -0,0 +1,221 @@
+import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import instrumentation
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prices')
+
+#fetchers take (ticker, start, end) and return daily bars indexed by date
+def yahoo_fetcher(ticker, start, end):
+    import yfinance as yf
+    df = yf.download(ticker, start=start, end=end, progress=False)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    return df
+
+#offline stand-in for yahoo, serves slices of frames it was given and records every request
+class LocalFetcher:
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = []
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((ticker, pd.Timestamp(start), pd.Timestamp(end)))
+        df = self.frames.get(ticker)
+        if df is None:
+            return pd.DataFrame()
+        return df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))].copy()
+
+#file name for a ticker, BRK.B -> BRK_B
+def safe_name(ticker):
+    return re.sub(r'[^A-Za-z0-9_-]', '_', ticker.upper())
+
+def _day(value, ceil=False):
+    value = pd.Timestamp(value)
+    if value.tzinfo is not None:
+        value = value.tz_localize(None)
+    return value.ceil('D') if ceil else value.normalize()
+
+#whether a refetched frame still has the stored close of a day, a split or dividend adjustment rewrites it
+def _same_bar(fetched, stored, day, column='Close'):
+    if day not in fetched.index:
+        return False
+    if column not in fetched or column not in stored:
+        return True
+    return bool(np.isclose(fetched.at[day, column], stored.at[day, column], rtol=1e-6, equal_nan=True))
+
+def _clean(df):
+    if df is None or len(df) == 0:
+        return None
+    df = df.copy()
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index
+    df.index.name = 'Date'
+    return df
+
+#one parquet file per ticker plus a small json sidecar recording which range has been asked for
+class PriceStore:
+    def __init__(self, root=STORE_DIR, fetcher=yahoo_fetcher):
+        self.root = root
+        self.fetcher = fetcher
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, ticker):
+        return os.path.join(self.root, safe_name(ticker) + '.parquet')
+
+    def _meta_path(self, ticker):
+        return os.path.join(self.root, safe_name(ticker) + '.json')
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(safe_name(ticker), threading.Lock())
+
+    #timed on the calling thread, counted from any thread
+    def _fetch(self, ticker, start, end):
+        instrumentation.count('price_store.fetch')
+        with instrumentation.timer('yf.download'):
+            df = _clean(self.fetcher(ticker, start, end))
+        instrumentation.count('price_store.fetched_rows', 0 if df is None else len(df))
+        return df
+
+    def read(self, ticker):
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def _read_meta(self, ticker):
+        path = self._meta_path(ticker)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            meta = json.load(f)
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def _write(self, ticker, df, start, end):
+        os.makedirs(self.root, exist_ok=True)
+        if df is not None:
+            tmp = self.path(ticker) + '.tmp'
+            df.to_parquet(tmp)
+            os.replace(tmp, self.path(ticker))
+        with open(self._meta_path(ticker), 'w') as f:
+            json.dump({'start': str(start.date()), 'end': str(end.date())}, f)
+
+    #bars for [start, end), only the part not already on disk goes to the fetcher
+    #every top-up refetches one stored bar too, so a segment that comes back empty failed (yfinance returns an
+    #empty frame on network errors) and the stored range is not widened over it, the next load asks again
+    #a refetched bar that no longer matches the stored one means the provider adjusted its history for a split
+    #or dividend, then the whole range is fetched again rather than splicing adjusted bars onto unadjusted ones
+    def load(self, ticker, start, end):
+        start, end = _day(start), _day(end, ceil=True)
+        with self._lock(ticker):
+            stored = self.read(ticker)
+            meta = self._read_meta(ticker) if stored is not None and len(stored) else None
+
+            if meta is None:
+                df = self._fetch(ticker, start, end)
+                if df is None:
+                    return pd.DataFrame()
+                self._write(ticker, df, start, end)
+                return df[(df.index >= start) & (df.index < end)]
+
+            covered_start, covered_end = meta
+            parts = [stored]
+            adjusted = False
+            if start < meta[0]:
+                first = stored.index[0]
+                head = self._fetch(ticker, start, first + pd.Timedelta(days=1))
+                if head is not None:
+                    adjusted |= not _same_bar(head, stored, first)
+                    parts.insert(0, head)
+                    covered_start = start
+            if end > meta[1]:
+                # the bar before the last stored one is complete, the last one may have been a partial intraday bar
+                check = stored.index[-2] if len(stored) > 1 else stored.index[-1]
+                tail = self._fetch(ticker, min(check, meta[1]), end)
+                if tail is not None:
+                    adjusted |= not _same_bar(tail, stored, check)
+                    parts.append(tail)
+                    covered_end = end
+            if adjusted:
+                refetched = self._fetch(ticker, covered_start, covered_end)
+                if refetched is None:
+                    # keep the consistent bars on disk as they are, the next load tries again
+                    return stored[(stored.index >= start) & (stored.index < end)]
+                parts = [refetched]
+
+            if len(parts) == 1 and not adjusted:
+                df = stored
+            else:
+                df = pd.concat(parts)
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+                self._write(ticker, df, covered_start, covered_end)
+
+        return df[(df.index >= start) & (df.index < end)]
+
+_default_store = None
+
+def default_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store
+
+def load_prices(ticker, start, end, store=None):
+    return (store or default_store()).load(ticker, start, end)
+
+#{ticker: bars} for a ticker list, fetched through a bounded thread pool
+#with an errors dict a failing ticker is recorded there and left out instead of raising
+#columns keeps only those columns of every frame, the rest of the bars can be freed right away
+def load_many(tickers, start, end, store=None, max_workers=8, errors=None, columns=None):
+    store = store or default_store()
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+
+    def select(df):
+        if columns is None or df is None or not len(df):
+            return df
+        return df[[c for c in columns if c in df]]
+
+    def load(ticker):
+        if errors is None:
+            return select(store.load(ticker, start, end))
+        try:
+            return select(store.load(ticker, start, end))
+        except Exception as e:
+            errors[ticker] = e
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as pool:
+        frames = list(pool.map(load, tickers))
+    return {t: df for t, df in zip(tickers, frames) if df is not None}
+
+#one column per ticker on a shared DatetimeIndex, tickers are fetched concurrently
+def load_close_frame(tickers, start, end, store=None, max_workers=8, column='Close'):
+    frames = load_many(tickers, start, end, store=store, max_workers=max_workers, columns=[column])
+    columns = {t: df[column] for t, df in frames.items() if column in df}
+    return pd.DataFrame(columns).sort_index()
+
+_preloads = {}
+_preloads_guard = threading.Lock()
+
+#warm the store for a whole universe on a daemon thread, one running preload per (tickers, start, end)
+def preload_in_background(tickers, start, end, store=None, max_workers=8):
+    key = (tuple(sorted(tickers)), str(_day(start)), str(_day(end, ceil=True)))
+    with _preloads_guard:
+        thread = _preloads.get(key)
+        if thread is not None and thread.is_alive():
+            return thread
+        thread = threading.Thread(target=load_many, args=(tickers, start, end, store, max_workers),
+                                  name='price-preload', daemon=True)
+        _preloads[key] = thread
+        thread.start()
+    return thread
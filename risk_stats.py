@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+def _frame(returns):
+    return returns.to_frame() if isinstance(returns, pd.Series) else returns
+
+#annual return, standard deviation (both in percent), risk adjusted return and max drawdown
+#for every column of a frame of daily returns in one pass, columns may have different histories
+def summary(returns, periods=TRADING_DAYS):
+    returns = _frame(returns)
+    r = returns.to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        annual_return = np.nanmean(r, axis=0) * periods * 100
+        stdev = np.nanstd(r, axis=0) * np.sqrt(periods) * 100
+        risk_adj_return = annual_return / stdev
+    return pd.DataFrame({
+        'annual_return': annual_return,
+        'stdev': stdev,
+        'risk_adj_return': risk_adj_return,
+        'max_drawdown': max_drawdown(returns).to_numpy(),
+    }, index=returns.columns)
+
+#largest peak to trough loss of the compounded returns, as a negative fraction
+def max_drawdown(returns):
+    returns = _frame(returns)
+    wealth = (1 + returns.fillna(0)).cumprod()
+    return (wealth / wealth.cummax() - 1).min()
+
+#rolling mean and standard deviation from running sums, O(n) whatever the window
+#a window with any missing value stays NaN
+def _rolling_moments(r, window):
+    valid = ~np.isnan(r)
+    x = np.where(valid, r, 0.0)
+    zeros = np.zeros((1, r.shape[1]))
+    s1 = np.concatenate([zeros, np.cumsum(x, axis=0)])
+    s2 = np.concatenate([zeros, np.cumsum(x * x, axis=0)])
+    n = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+
+    mean = np.full(r.shape, np.nan)
+    std = np.full(r.shape, np.nan)
+    if len(r) >= window:
+        full = (n[window:] - n[:-window]) == window
+        m = (s1[window:] - s1[:-window]) / window
+        var = np.maximum((s2[window:] - s2[:-window]) / window - m * m, 0)
+        mean[window-1:] = np.where(full, m, np.nan)
+        std[window-1:] = np.where(full, np.sqrt(var), np.nan)
+    return mean, std
+
+def rolling_volatility(returns, window=63, periods=TRADING_DAYS):
+    returns = _frame(returns)
+    _, std = _rolling_moments(returns.to_numpy(dtype=float), window)
+    return pd.DataFrame(std * np.sqrt(periods) * 100, index=returns.index, columns=returns.columns)
+
+def rolling_sharpe(returns, window=63, periods=TRADING_DAYS, risk_free=0.0):
+    returns = _frame(returns)
+    mean, std = _rolling_moments(returns.to_numpy(dtype=float) - risk_free / periods, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = mean / std * np.sqrt(periods)
+    return pd.DataFrame(sharpe, index=returns.index, columns=returns.columns)
+
+#worst drop within each trailing window, measured from the running peak inside that same window
+#so a value at t only depends on wealth[t-window+1:t+1]
+#(peak, trough, worst drop) of two adjacent spans combine associatively, the drop across them being
+#the right trough against the left peak, so every window is a two-stack sliding aggregate: the suffixes of one
+#block of window bars (the front stack, rebuilt every window bars) joined with the prefixes of the next (the back
+#stack), all computed with running max/min over the blocks, O(n) per column
+def rolling_max_drawdown(returns, window=63):
+    returns = _frame(returns)
+    wealth = (1 + returns.fillna(0)).cumprod().to_numpy(dtype=float)
+    n, m = wealth.shape
+    out = np.full(wealth.shape, np.nan)
+    if n >= window:
+        # leading filler so the bars split into whole blocks, no kept window reaches into it
+        pad = -n % window
+        w = np.concatenate([np.ones((pad, m)), wealth]).reshape(-1, window, m)
+        peak = np.maximum.accumulate(w, axis=1)
+        prefix_trough = np.minimum.accumulate(w, axis=1)
+        prefix_drop = np.minimum.accumulate(w / peak - 1, axis=1)
+
+        reverse = w[:, ::-1]
+        suffix_peak = np.maximum.accumulate(reverse, axis=1)[:, ::-1]
+        suffix_trough = np.minimum.accumulate(reverse, axis=1)[:, ::-1]
+        # the worst drop starting at bar i is its fall to the lowest bar after it or any drop starting later
+        later = np.concatenate([suffix_trough[:, 1:], np.full((len(w), 1, m), np.inf)], axis=1)
+        suffix_drop = np.minimum.accumulate((np.minimum(later, w) / w - 1)[:, ::-1], axis=1)[:, ::-1]
+
+        end = np.arange(pad + window - 1, pad + n)
+        start = end - window + 1
+        head = prefix_drop.reshape(-1, m)[end]
+        tail = suffix_drop.reshape(-1, m)[start]
+        across = prefix_trough.reshape(-1, m)[end] / suffix_peak.reshape(-1, m)[start] - 1
+        # a window that is exactly one block is its prefix alone
+        out[window-1:] = np.where((start % window == 0)[:, None], head, np.minimum(np.minimum(tail, across), head))
+    return pd.DataFrame(out, index=returns.index, columns=returns.columns)
+
+def rolling(returns, window=63, periods=TRADING_DAYS):
+    returns = _frame(returns)
+    return {
+        'sharpe': rolling_sharpe(returns, window, periods),
+        'volatility': rolling_volatility(returns, window, periods),
+        'max_drawdown': rolling_max_drawdown(returns, window),
+    }
+
+#percent change of a wide price frame, first row dropped
+def daily_returns(prices):
+    return (prices / prices.shift(1) - 1).iloc[1:]
+
+#watchlist sorted on one summary column, best first
+def rank(returns, by='risk_adj_return', periods=TRADING_DAYS):
+    ascending = by == 'stdev'
+    return summary(returns, periods).sort_values(by, ascending=ascending)
@@ -0,0 +1,222 @@
+import os
+import glob
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import price_store
+
+SENTIMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sentiment')
+SUMMARY_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'data.csv')
+# columns of data/data.csv, one row per stock and news day
+SCHEMA = ['id', 'stock', 'news_dt', 'check_day', 'open', 'close', 'high', 'low', 'volume', 'change',
+          'sentiment_summary_avg', 'sentiment_summary_med', 'sentiment_title_avg', 'sentiment_title_med']
+# news at or after the close, New York time, can only move the next session
+MARKET_TZ = 'America/New_York'
+CLOSING_HOUR = 16
+BATCH_SIZE = 10000
+
+TOKEN = r"[a-z]+(?:'[a-z]+)?"
+NEGATIONS = frozenset(['not', 'no', 'never', 'nor', 'without', "isn't", "aren't", "wasn't", "weren't", "don't",
+                       "doesn't", "didn't", "won't", "can't", "couldn't", "shouldn't", "wouldn't", "hasn't", "haven't"])
+# same constants as VADER, a negated word keeps 74% of its valence with the sign flipped
+NEGATION_SCALE = -0.74
+NORMALIZATION_ALPHA = 15
+
+# fallback word valences on the VADER -4..4 scale, used when nltk's vader_lexicon isn't downloaded
+FINANCE_LEXICON = {
+    'beat': 1.8, 'beats': 1.8, 'boost': 1.7, 'boosts': 1.7, 'bullish': 2.2, 'buy': 1.0, 'climb': 1.3, 'climbs': 1.3,
+    'gain': 1.9, 'gains': 1.9, 'good': 1.9, 'great': 3.1, 'growth': 1.6, 'high': 0.8, 'higher': 1.1, 'jump': 1.4,
+    'jumps': 1.4, 'outperform': 2.0, 'positive': 2.3, 'profit': 1.9, 'profitable': 2.0, 'profits': 1.9,
+    'rally': 1.8, 'rallies': 1.8, 'record': 1.2, 'recover': 1.5, 'recovery': 1.5, 'rise': 1.2, 'rises': 1.2,
+    'soar': 2.3, 'soars': 2.3, 'strong': 2.3, 'stronger': 2.1, 'success': 2.7, 'surge': 2.0, 'surges': 2.0,
+    'top': 0.8, 'upbeat': 2.1, 'upgrade': 1.9, 'upgraded': 1.9, 'win': 2.8, 'wins': 2.7,
+    'bankrupt': -2.6, 'bankruptcy': -2.6, 'bearish': -2.2, 'concern': -1.4, 'concerns': -1.4, 'crash': -2.8,
+    'cut': -1.1, 'cuts': -1.1, 'decline': -1.6, 'declines': -1.6, 'default': -1.8, 'downgrade': -1.9,
+    'downgraded': -1.9, 'drop': -1.1, 'drops': -1.1, 'fall': -1.3, 'falls': -1.3, 'fear': -2.2, 'fears': -2.2,
+    'fine': -0.5, 'fraud': -2.8, 'lawsuit': -1.8, 'layoffs': -2.0, 'lose': -1.7, 'loses': -1.7, 'loss': -1.6,
+    'losses': -1.6, 'lower': -0.9, 'miss': -1.4, 'misses': -1.4, 'negative': -2.7, 'plunge': -2.4,
+    'plunges': -2.4, 'probe': -1.2, 'recall': -1.3, 'recession': -2.3, 'risk': -1.1, 'risks': -1.1,
+    'sell': -0.8, 'selloff': -2.0, 'slump': -2.1, 'slumps': -2.1, 'tumble': -2.0, 'tumbles': -2.0,
+    'underperform': -2.0, 'warning': -1.8, 'weak': -1.9, 'weaker': -1.9, 'worst': -3.1,
+}
+
+_lexicon = None
+
+#nltk's vader lexicon when it has been downloaded, the finance word list otherwise
+def default_lexicon():
+    global _lexicon
+    if _lexicon is None:
+        try:
+            import nltk
+            with nltk.data.find('sentiment/vader_lexicon.zip').open('vader_lexicon/vader_lexicon.txt') as f:
+                rows = [line.decode('utf-8').split('\t') for line in f]
+            _lexicon = {r[0]: float(r[1]) for r in rows if len(r) > 1}
+        except (ImportError, LookupError, OSError):
+            _lexicon = dict(FINANCE_LEXICON)
+    return _lexicon
+
+#compound sentiment in [-1, 1] for every text, scored batch by batch on the exploded tokens
+#a word right after a negation has its valence flipped, the sum is normalised like VADER's compound score
+def score(texts, lexicon=None, batch_size=BATCH_SIZE):
+    lexicon = lexicon or default_lexicon()
+    texts = pd.Series(texts, dtype=object).fillna('').astype(str).reset_index(drop=True)
+    out = np.zeros(len(texts))
+    for start in range(0, len(texts), batch_size):
+        batch = texts.iloc[start:start+batch_size]
+        tokens = batch.str.lower().str.findall(TOKEN).explode().dropna()
+        if not len(tokens):
+            continue
+        rows = tokens.index.to_numpy() - start
+        values = tokens.map(lexicon).fillna(0.0).to_numpy(dtype=float)
+        negation = tokens.isin(NEGATIONS).to_numpy()
+        negated = np.zeros(len(tokens), dtype=bool)
+        negated[1:] = negation[:-1] & (rows[1:] == rows[:-1])
+        values = np.where(negated, values * NEGATION_SCALE, values)
+        total = np.bincount(rows, weights=values, minlength=len(batch))
+        out[start:start+len(batch)] = total / np.sqrt(total * total + NORMALIZATION_ALPHA)
+    return out
+
+#the day whose bar a tz aware publication time can affect, its own day before the close and the next day after it
+#taken in New York time so the close follows daylight saving (21:00 UTC in winter, 20:00 UTC in summer)
+def check_days(published, closing_hour=CLOSING_HOUR):
+    local = published.dt.tz_convert(MARKET_TZ).dt.tz_localize(None)
+    after_close = (local.dt.hour >= closing_hour).astype(int)
+    return local.dt.normalize() + pd.to_timedelta(after_close, unit='D')
+
+#first moment (UTC) of news that counts towards a check day, the close of the day before
+def window_start(check, closing_hour=CLOSING_HOUR):
+    start = pd.Timestamp(check).normalize() - pd.Timedelta(days=1) + pd.Timedelta(hours=closing_hour)
+    return start.tz_localize(MARKET_TZ).tz_convert('UTC')
+
+#average and median sentiment of titles and summaries per (stock, check day), every article is assigned
+#to the day whose bar it can affect on its own, news_dt is the latest article of the group (UTC)
+def daily_sentiment(articles, closing_hour=CLOSING_HOUR, batch_size=BATCH_SIZE):
+    articles = articles.dropna(subset=['published'])
+    articles = articles.assign(
+        stock=articles['stock'].str.upper(),
+        published=articles['published'].dt.tz_convert('UTC').dt.tz_localize(None),
+        check=check_days(articles['published'], closing_hour),
+        sentiment_title=score(articles['title'], batch_size=batch_size),
+        sentiment_summary=score(articles['summary'], batch_size=batch_size),
+    )
+    return articles.groupby(['stock', 'check'], sort=False).agg(
+        news_dt=('published', 'max'),
+        sentiment_summary_avg=('sentiment_summary', 'mean'),
+        sentiment_summary_med=('sentiment_summary', 'median'),
+        sentiment_title_avg=('sentiment_title', 'mean'),
+        sentiment_title_med=('sentiment_title', 'median'),
+    ).reset_index()
+
+#join each check day to the first bar on or after its check day with an as-of merge per stock
+#rows whose bar isn't complete yet keep change UNCHECKED and are filled in by a later run
+def attach_prices(daily, frames, today=None):
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    bars = [df[['Open', 'Close', 'High', 'Low', 'Volume']].assign(stock=stock.upper())
+            for stock, df in frames.items() if df is not None and len(df)]
+    columns = ['date', 'stock', 'open', 'close', 'high', 'low', 'volume']
+    if bars:
+        bars = pd.concat(bars).rename_axis('date').reset_index()
+        bars.columns = [c.lower() for c in bars.columns]
+        bars['date'] = pd.to_datetime(bars['date']).dt.tz_localize(None).astype('datetime64[ns]')
+        bars = bars[columns].sort_values('date')
+    else:
+        bars = pd.DataFrame({c: pd.Series(dtype='datetime64[ns]' if c == 'date' else float) for c in columns})
+        bars['stock'] = bars['stock'].astype(object)
+    daily = daily.assign(check=daily['check'].astype('datetime64[ns]')).sort_values('check')
+    merged = pd.merge_asof(daily, bars, left_on='check', right_on='date', by='stock',
+                           direction='forward', tolerance=pd.Timedelta(days=7))
+    checked = merged['date'].notna() & (merged['date'] < today)
+    merged.loc[~checked, ['open', 'close', 'high', 'low', 'volume']] = np.nan
+    merged['change'] = np.where(checked, np.where(merged['open'] >= merged['close'], 'loss', 'win'), 'UNCHECKED')
+    merged['check_day'] = merged['date'].where(checked, merged['check']).dt.strftime('%Y-%m-%d')
+    merged['id'] = merged['stock'] + '_' + merged['check'].dt.strftime('%Y-%m-%d')
+    return merged[SCHEMA].sort_values(['stock', 'news_dt']).reset_index(drop=True)
+
+#one parquet file per stock holding its rows of the data/data.csv schema, ordered by news date
+class SentimentStore:
+    def __init__(self, root=SENTIMENT_DIR):
+        self.root = root
+
+    def path(self, stock):
+        return os.path.join(self.root, price_store.safe_name(stock) + '.parquet')
+
+    def read(self, stocks=None):
+        paths = [self.path(s) for s in stocks] if stocks is not None else sorted(glob.glob(os.path.join(self.root, '*.parquet')))
+        frames = [pd.read_parquet(p) for p in paths if os.path.exists(p)]
+        if not frames:
+            return pd.DataFrame(columns=SCHEMA)
+        return pd.concat(frames, ignore_index=True)
+
+    #replace rows by id and add new ones, only the files of the stocks in rows are rewritten
+    def upsert(self, rows):
+        os.makedirs(self.root, exist_ok=True)
+        for stock, new in rows.groupby('stock', sort=False):
+            old = self.read([stock])
+            combined = pd.concat([old, new], ignore_index=True) if len(old) else new
+            combined = combined.drop_duplicates('id', keep='last').sort_values('news_dt')
+            path = self.path(stock)
+            combined[SCHEMA].to_parquet(path + '.tmp', index=False)
+            os.replace(path + '.tmp', path)
+
+    #start (UTC) of the news of the first row that still needs work for the stock: the earliest unchecked row,
+    #else the last stored one, whose articles may still grow, every article from there on is scored again
+    def resume_from(self, stock, closing_hour=CLOSING_HOUR):
+        stored = self.read([stock])
+        if not len(stored):
+            return None
+        unchecked = stored.loc[stored['change'] == 'UNCHECKED', 'news_dt']
+        since = unchecked.min() if len(unchecked) else stored['news_dt'].max()
+        check = check_days(pd.Series([pd.Timestamp(since)]).dt.tz_localize('UTC'), closing_hour).iloc[0]
+        return window_start(check, closing_hour)
+
+    #the semicolon separated data/data.csv layout
+    def write_csv(self, path=SUMMARY_CSV, stocks=None):
+        rows = self.read(stocks)
+        rows.assign(news_dt=pd.to_datetime(rows['news_dt']).dt.strftime('%Y-%m-%d %H:%M:%S'))[SCHEMA].to_csv(
+            path, sep=';', index=False)
+
+#score the stored news of each stock from where the previous run left off, join prices and write the new rows
+#returns the rows that were written
+def update(stocks, news=None, store=None, prices=None, closing_hour=CLOSING_HOUR, today=None):
+    import news_store
+    news = news or news_store.default_store()
+    store = store or SentimentStore()
+    stocks = list(dict.fromkeys(s.upper() for s in stocks))
+    articles = [news.articles([s], since=store.resume_from(s, closing_hour)) for s in stocks]
+    articles = [a for a in articles if len(a)]
+    if not articles:
+        return pd.DataFrame(columns=SCHEMA)
+    daily = daily_sentiment(pd.concat(articles, ignore_index=True), closing_hour)
+    start = daily['check'].min()
+    end = max(daily['check'].max() + pd.Timedelta(days=8), pd.Timestamp(today or datetime.now()))
+    frames = price_store.load_many(daily['stock'].unique(), start, end, store=prices, errors={},
+                                   columns=['Open', 'Close', 'High', 'Low', 'Volume'])
+    rows = attach_prices(daily, frames, today)
+    store.upsert(rows)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score stored news and write daily sentiment with prices per stock.')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--tickers', nargs='+', help='ticker symbols')
+    group.add_argument('--file', help='file with one ticker per line')
+    parser.add_argument('--ingest', action='store_true', help='poll the news feeds before scoring')
+    parser.add_argument('--csv', nargs='?', const=SUMMARY_CSV, help='also export the store to this csv, default data/data.csv')
+    args = parser.parse_args(argv)
+
+    import universe
+    import news_store
+    tickers = universe.read_ticker_file(args.file) if args.file else args.tickers
+    if args.ingest:
+        errors = {}
+        news_store.ingest(tickers, news_store.default_store(), errors=errors)
+        for ticker, error in errors.items():
+            print(f"no news for {ticker}: {error!r}")
+    rows = update(tickers)
+    print(f"wrote {len(rows)} stock-days for {rows['stock'].nunique()} tickers")
+    if args.csv:
+        SentimentStore().write_csv(args.csv)
+
+if __name__ == '__main__':
+    main()
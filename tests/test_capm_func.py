@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import capm_func
+
+def prices(rows=300, tickers=('AAPL', 'MSFT', 'GOOG'), seed=0):
+    rng = np.random.default_rng(seed)
+    data = {'Date': pd.bdate_range('2022-01-03', periods=rows)}
+    for name in (*tickers, 'sp500'):
+        data[name] = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, rows)))
+    return pd.DataFrame(data)
+
+#the per element loop daily_return used before it was vectorized, run for every column
+def loop_daily_return(df):
+    out = df.copy()
+    for i in df.columns[1:]:
+        values = df[i].to_numpy(dtype=float)
+        column = np.zeros(len(df))
+        for j in range(1, len(df)):
+            column[j] = ((values[j] - values[j-1]) / values[j-1]) * 100
+        out[i] = column
+    return out
+
+def test_daily_return_matches_loop_for_every_column():
+    df = prices()
+    expected = loop_daily_return(df)
+    result = capm_func.daily_return(df)
+    for column in df.columns[1:]:
+        np.testing.assert_allclose(result[column], expected[column], rtol=0, atol=1e-12)
+    assert (result.iloc[0, 1:] == 0).all()
+
+def test_normalize_divides_by_first_row():
+    df = prices()
+    result = capm_func.normalize(df)
+    for column in df.columns[1:]:
+        np.testing.assert_allclose(result[column], df[column] / df[column].iloc[0])
+
+def test_betas_match_polyfit():
+    returns = capm_func.daily_return(prices())
+    betas, alphas = capm_func.calculate_betas(returns)
+    for stock in ('AAPL', 'MSFT', 'GOOG'):
+        b, a = np.polyfit(returns['sp500'], returns[stock], 1)
+        assert abs(betas[stock] - b) < 1e-12
+        assert abs(alphas[stock] - a) < 1e-12
+        assert np.allclose(capm_func.calculate_beta(returns, stock), (b, a), rtol=0, atol=1e-12)
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import charting
+
+#lttb as first written, averaging the next bucket inside the loop
+def loop_lttb(x, y, n_out):
+    n = len(y)
+    x = charting._as_float(x)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = [0]
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i+1]
+        nlo, nhi = hi, edges[i+2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep.append(a)
+    return np.array(keep + [n - 1])
+
+def test_lttb_matches_the_loop():
+    rng = np.random.default_rng(0)
+    for n, n_out in [(5000, 1000), (1001, 1000), (777, 50), (10, 3)]:
+        x = pd.bdate_range('2000-01-03', periods=n).to_numpy()
+        y = np.cumsum(rng.normal(size=n))
+        keep = charting.lttb(x, y, n_out)
+        assert len(keep) == n_out
+        assert keep[0] == 0 and keep[-1] == n - 1
+        np.testing.assert_array_equal(keep, loop_lttb(x, y, n_out))
+
+def test_lttb_keeps_short_series():
+    np.testing.assert_array_equal(charting.lttb(np.arange(5), np.arange(5.0), 10), np.arange(5))
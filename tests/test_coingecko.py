@@ -0,0 +1,80 @@
+import time
+import threading
+import pytest
+import coingecko
+
+@pytest.fixture
+def server():
+    with coingecko.LocalMarketServer(coins=600) as server:
+        yield server
+
+def client(server, ttl=0, **kwargs):
+    return coingecko.MarketClient(server.url, session=coingecko.make_session(backoff=0.01), ttl=ttl,
+                                  limiter=coingecko.RateLimiter(60000), **kwargs)
+
+#a slow refresh of one currency doesn't hold up another, only reruns of the same currency wait for it
+def test_currencies_refresh_independently(server):
+    server.delay = 0.3
+    markets = client(server, ttl=60, per_page=250)
+    threads = [threading.Thread(target=markets.markets, args=(c, 250)) for c in ('usd', 'eur', 'usd')]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert time.perf_counter() - start < 0.55
+    assert markets.requests == 2
+    assert set(markets.stats()['currencies']) == {'usd', 'eur'}
+
+def test_pages_are_fetched_and_stitched_in_rank_order(server):
+    markets = client(server, per_page=100)
+    df = markets.markets('usd', 350)
+    assert len(df) == 350
+    assert df.id.tolist() == [f'coin-{i}' for i in range(350)]
+    assert sorted(page for page, _ in server.log) == [1, 2, 3, 4]
+    assert markets.requests == 4
+
+#expired pages are revalidated with their ETag, unchanged ones come back 304 and keep their rows
+def test_unchanged_pages_are_reused_after_a_304(server):
+    markets = client(server, per_page=100)
+    first = markets.markets('usd', 300)
+    server.log.clear()
+    server.tick(n=10, change=0.5)
+    second = markets.markets('usd', 300)
+    assert sorted(server.log) == [(1, 200), (2, 304), (3, 304)]
+    assert markets.not_modified == 2
+    assert second.current_price.iloc[0] == pytest.approx(first.current_price.iloc[0] * 1.5)
+    assert second.iloc[10:].equals(first.iloc[10:])
+
+def test_fresh_frame_makes_no_requests(server):
+    markets = client(server, ttl=60, per_page=100)
+    markets.markets('usd', 200)
+    assert len(markets.markets('usd', 150)) == 150
+    assert markets.requests == 2
+
+#fewer coins than before drops the pages past the new range
+def test_shrinking_the_range_drops_old_pages(server):
+    markets = client(server, per_page=100)
+    markets.markets('usd', 300)
+    df = markets.markets('usd', 100)
+    assert len(df) == 100
+    assert markets.stats()['currencies'] == {'usd': 100}
+
+def test_throttled_requests_are_retried(server):
+    server.throttle_first = 2
+    df = client(server, per_page=100).markets('usd', 100)
+    assert len(df) == 100
+    assert [status for _, status in server.log] == [429, 429, 200]
+
+def test_rate_limiter_spaces_calls_beyond_the_burst():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = coingecko.RateLimiter(60, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        limiter.acquire()
+    assert sleeps == pytest.approx([1.0, 1.0])
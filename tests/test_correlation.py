@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+import correlation
+
+def returns(rows=300, tickers=12, seed=0):
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.01, (rows, 1))
+    data = common + rng.normal(0, 0.01, (rows, tickers))
+    df = pd.DataFrame(data, index=pd.bdate_range('2023-01-02', periods=rows, name='Date'),
+                      columns=[f'T{i}' for i in range(tickers)])
+    # a late listing and a few missing days
+    df.iloc[:120, 3] = np.nan
+    df.iloc[[10, 50, 51], 7] = np.nan
+    return df
+
+def assert_matches_pandas(engine, df):
+    assert np.allclose(engine.correlation().to_numpy(), df.corr(min_periods=3).to_numpy(), atol=1e-5, equal_nan=True)
+    assert np.allclose(engine.covariance().to_numpy(), df.cov(min_periods=3).to_numpy(), atol=1e-8, equal_nan=True)
+
+def test_matches_pandas_pairwise_complete():
+    df = returns()
+    engine = correlation.CorrelationEngine(block=5)
+    assert engine.update(df) == len(df)
+    assert_matches_pandas(engine, df)
+
+def test_new_rows_are_added_incrementally():
+    df = returns()
+    engine = correlation.CorrelationEngine(block=5)
+    engine.update(df.iloc[:200])
+    assert engine.update(df) == 100
+    assert engine.update(df) == 0
+    assert_matches_pandas(engine, df)
+
+#a changed bar inside the ingested history rebuilds the sums of that ticker, with or without new rows
+def test_revised_history_is_rebuilt():
+    df = returns()
+    engine = correlation.CorrelationEngine(block=5)
+    engine.update(df.iloc[:250])
+    revised = df.copy()
+    revised.iloc[40, 2] = 0.08
+    assert engine.update(revised.iloc[:250]) == 0
+    assert_matches_pandas(engine, revised.iloc[:250])
+    revised.iloc[100, 9] = -0.05
+    assert engine.update(revised) == 50
+    assert_matches_pandas(engine, revised)
+
+#a ticker whose missing history is filled in later
+def test_backfilled_gap_is_rebuilt():
+    df = returns()
+    partial = df.copy()
+    partial.iloc[:200, 5] = np.nan
+    engine = correlation.CorrelationEngine(block=5)
+    engine.update(partial)
+    engine.update(df)
+    assert_matches_pandas(engine, df)
+
+def test_changed_dates_start_over():
+    df = returns()
+    engine = correlation.CorrelationEngine()
+    engine.update(df.drop(index=df.index[30]).iloc[:200])
+    engine.update(df)
+    assert engine.rows == len(df)
+    assert_matches_pandas(engine, df)
+
+def test_persisted_engine_detects_revisions(tmp_path):
+    df = returns()
+    correlation.CorrelationEngine(str(tmp_path), memmap=True, block=5).update(df.iloc[:250])
+    revised = df.copy()
+    revised.iloc[10:20, 4] *= 2
+    engine = correlation.CorrelationEngine(str(tmp_path), memmap=True, block=5)
+    assert engine.update(revised) == 50
+    assert_matches_pandas(engine, revised)
+    assert_matches_pandas(correlation.CorrelationEngine(str(tmp_path), block=5), revised)
+
+def test_sector_averages():
+    corr = pd.DataFrame([[1, 0.8, 0.1], [0.8, 1, 0.3], [0.1, 0.3, 1]], index=list('abc'), columns=list('abc'))
+    sectors = correlation.sector_correlation(corr, {'a': 'X', 'b': 'X', 'c': 'Y'})
+    assert sectors.loc['X', 'X'] == pytest.approx(0.8)
+    assert sectors.loc['X', 'Y'] == pytest.approx(0.2)
+    assert np.isnan(sectors.loc['Y', 'Y'])
@@ -0,0 +1,80 @@
+import threading
+import pandas as pd
+import data_access
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = data_access.TTLCache(ttl=60, maxsize=8, clock=clock)
+    cache.set('a', 1)
+    clock.now = 59.9
+    assert cache.get('a') == (True, 1)
+    clock.now = 60
+    assert cache.get('a') == (False, None)
+    assert cache.stats()['size'] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = data_access.TTLCache(ttl=60, maxsize=2, clock=Clock())
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1) and cache.get('c') == (True, 3)
+    assert cache.evictions == 1
+
+def test_expired_entry_is_reloaded():
+    clock = Clock()
+    cache = data_access.TTLCache(ttl=10, maxsize=8, clock=clock)
+    loads = []
+    load = lambda: loads.append(clock.now) or len(loads)
+    assert cache.get_or_load('k', load) == 1
+    assert cache.get_or_load('k', load) == 1
+    clock.now = 10
+    assert cache.get_or_load('k', load) == 2
+    assert loads == [0, 10]
+
+#threads that miss the same key together wait for one load instead of each running it
+def test_concurrent_misses_share_one_load():
+    cache = data_access.TTLCache(ttl=60, maxsize=8)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('k', load))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == [1] and results == ['value'] * 4
+
+def test_cached_returns_copies_of_frames():
+    calls = []
+
+    @data_access.cached('close_prices', key=lambda name: ('test', name))
+    def frame(name):
+        calls.append(name)
+        return pd.DataFrame({'x': [1.0, 2.0]})
+
+    data_access.clear('close_prices')
+    first = frame('a')
+    first.loc[0, 'x'] = 100
+    assert frame('a').loc[0, 'x'] == 1.0
+    assert calls == ['a']
+    data_access.clear('close_prices')
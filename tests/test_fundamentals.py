@@ -0,0 +1,35 @@
+import time
+import pandas as pd
+import pytest
+import fundamentals
+
+def provider(delay=0):
+    data = {'AAPL': {'info': {'longName': 'Apple'}, 'balance_sheet': pd.DataFrame({'2023': [1.0]}),
+                     'financials': pd.DataFrame({'2023': [2.0]})}}
+    return fundamentals.LocalProvider(data, delay=delay)
+
+#only the requested statements are fetched, the rest cost nothing until asked for
+def test_load_fetches_only_requested_statements():
+    local = provider()
+    result = fundamentals.load('AAPL', local, statements=('info',))
+    assert local.calls == [('AAPL', 'info')]
+    assert result.get('info') == {'longName': 'Apple'}
+    assert set(result.timings) == {'info'}
+
+def test_statements_are_timed_and_fetched_concurrently():
+    local = provider(delay=0.2)
+    start = time.perf_counter()
+    result = fundamentals.load('AAPL', local, statements=('info', 'balance_sheet', 'financials'))
+    elapsed = time.perf_counter() - start
+    assert sorted(local.calls) == [('AAPL', 'balance_sheet'), ('AAPL', 'financials'), ('AAPL', 'info')]
+    assert set(result.timings) == {'info', 'balance_sheet', 'financials'}
+    assert all(seconds >= 0.2 for seconds in result.timings.values())
+    assert elapsed < 0.5
+
+def test_failed_statement_is_recorded_and_raised_on_access():
+    result = fundamentals.load('AAPL', provider())
+    assert set(result.data) == {'info', 'balance_sheet', 'financials'}
+    assert set(result.errors) == {'cashflow'}
+    assert 'cashflow' in result.timings
+    with pytest.raises(KeyError):
+        result.get('cashflow')
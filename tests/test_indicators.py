@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+import indicators
+
+SMA, EMA = [5, 20, 50], [10, 30]
+
+def closes(rows=300, seed=0):
+    index = pd.bdate_range('2020-01-01', periods=rows, name='Date')
+    return pd.Series(100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, rows))), index=index)
+
+#what the page computed with pandas before the engine
+def expected(close):
+    columns = {indicators.sma_name(w): close.rolling(w).mean() for w in SMA}
+    for w in EMA:
+        raw = close.ewm(span=w, adjust=False).mean()
+        raw.iloc[:w-1] = np.nan
+        columns[indicators.ema_name(w)] = raw
+    return pd.DataFrame(columns)
+
+def assert_matches_pandas(engine, close):
+    pd.testing.assert_frame_equal(engine.compute('AAPL', close, SMA, EMA), expected(close), check_freq=False)
+
+def test_sma_matches_rolling_mean():
+    close = closes()
+    for w, ma in indicators.sma(close, SMA).items():
+        assert np.allclose(ma, close.rolling(w).mean(), equal_nan=True)
+
+#a missing close only blanks the windows that contain it
+@pytest.mark.parametrize('missing', [[10], [0, 1, 2], [120, 121, 299]])
+def test_missing_closes_match_pandas(missing):
+    close = closes()
+    close.iloc[missing] = np.nan
+    for w, ma in indicators.sma(close, SMA).items():
+        assert np.allclose(ma, close.rolling(w).mean(), equal_nan=True)
+    assert_matches_pandas(indicators.IndicatorEngine(), close)
+
+def test_new_bars_extend_the_stored_series():
+    close = closes()
+    close.iloc[[40, 198, 199]] = np.nan
+    engine = indicators.IndicatorEngine()
+    for end in [30, 150, 199, 200, 240, len(close)]:
+        assert_matches_pandas(engine, close.iloc[:end])
+    assert len(engine._state['AAPL']['values']) == len(close)
+
+#an intraday close revised on the next refresh is computed again instead of extended
+def test_revised_last_bar_is_recomputed():
+    close = closes()
+    engine = indicators.IndicatorEngine()
+    partial = close.iloc[:200].copy()
+    partial.iloc[-1] *= 1.05
+    assert_matches_pandas(engine, partial)
+    assert_matches_pandas(engine, close)
+
+def test_parse_windows():
+    assert indicators.parse_windows('20, 30;x, 0, 20') == [20, 30]
@@ -0,0 +1,52 @@
+import os
+import sys
+import subprocess
+import numpy as np
+import pytest
+import lstm_numpy
+import model_registry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#an untrained model with the production architecture, saved and exported like train.py does
+@pytest.fixture(scope='module')
+def artifacts(tmp_path_factory):
+    pytest.importorskip('tensorflow')
+    import train
+    path = str(tmp_path_factory.mktemp('model') / 'model.keras')
+    train.build_model().save(path)
+    lstm_numpy.export(path, os.path.splitext(path)[0] + '.npz')
+    return path
+
+def test_numpy_backend_matches_keras(artifacts):
+    keras_model = model_registry.get_model(artifacts, warmup=False, backend='keras')
+    numpy_model = model_registry.get_model(artifacts, warmup=False, backend='numpy')
+    x = np.random.default_rng(0).random((64, 100, 1), dtype=np.float32)
+    expected = keras_model.predict(x, verbose=0)
+    actual = numpy_model.predict(x, verbose=0)
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+#the weights committed next to the production model are an export of that same model
+def test_shipped_npz_matches_shipped_keras():
+    pytest.importorskip('tensorflow')
+    path = os.path.join(ROOT, model_registry.DEFAULT_MODEL)
+    keras_model = model_registry.get_model(path, warmup=False, backend='keras')
+    numpy_model = model_registry.get_model(path, warmup=False, backend='numpy')
+    # min-max scaled random walks, the inputs the app feeds the model
+    walks = np.cumsum(np.random.default_rng(1).normal(0, 0.01, (64, 100, 1)), axis=1)
+    lo, hi = walks.min(axis=1, keepdims=True), walks.max(axis=1, keepdims=True)
+    x = ((walks - lo) / (hi - lo)).astype(np.float32)
+    expected = keras_model.predict(x, verbose=0)
+    actual = numpy_model.predict(x, verbose=0)
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        model_registry.artifact_path('model.keras', backend='torch')
+    env = {**os.environ, 'STOCK_MODEL_BACKEND': 'nmupy'}
+    out = subprocess.run([sys.executable, '-c', 'import model_registry'], cwd=ROOT, env=env,
+                         capture_output=True, text=True)
+    assert out.returncode != 0
+    assert 'STOCK_MODEL_BACKEND' in out.stderr
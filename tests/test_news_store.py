@@ -0,0 +1,50 @@
+import threading
+import pytest
+import news_store
+
+def entries(stock, n):
+    return [{'guid': f'{stock}-{i}', 'title': f'{stock} story {i}', 'summary': '', 'link': f'https://example.com/{stock}/{i}',
+             'published': f'Mon, 0{i + 1} Jan 2024 12:00:00 +0000'} for i in range(n)]
+
+@pytest.fixture
+def store(tmp_path):
+    return news_store.NewsStore(str(tmp_path / 'news.sqlite'))
+
+def test_ingest_deduplicates_and_revalidates(store):
+    feeds = news_store.LocalFeeds({'AAPL': entries('AAPL', 3), 'MSFT': entries('MSFT', 2)})
+    assert news_store.ingest(['aapl', 'MSFT'], store, feeds) == {'AAPL': 3, 'MSFT': 2}
+    assert news_store.ingest(['AAPL', 'MSFT'], store, feeds) == {'AAPL': 0, 'MSFT': 0}
+    assert sorted(feeds.calls[2:]) == [('AAPL', True), ('MSFT', True)]
+    latest = store.latest('AAPL')
+    assert latest.guid.tolist() == ['AAPL-2', 'AAPL-1', 'AAPL-0']
+    assert str(latest.published.dt.tz) == 'UTC'
+
+def test_failed_feed_is_recorded_and_marked_checked(store):
+    errors = {}
+    feeds = news_store.LocalFeeds({'AAPL': entries('AAPL', 1)})
+    assert news_store.ingest(['AAPL', 'NONE'], store, feeds, errors=errors) == {'AAPL': 1}
+    assert isinstance(errors['NONE'], KeyError)
+    assert store.stale(['AAPL', 'NONE']) == []
+
+#finished refreshes are dropped and at most max_running poll at once
+def test_background_refreshes_are_capped(store, monkeypatch):
+    monkeypatch.setattr(news_store, '_refreshes', {})
+    release = threading.Event()
+    feeds = news_store.LocalFeeds({f'S{i}': entries(f'S{i}', 1) for i in range(4)})
+
+    def blocking(stock, etag=None, modified=None):
+        release.wait(5)
+        return feeds(stock, etag, modified)
+
+    first = news_store.refresh_in_background(['S0'], store, blocking, max_running=2)
+    assert news_store.refresh_in_background(['s0'], store, blocking, max_running=2) is first
+    news_store.refresh_in_background(['S1'], store, blocking, max_running=2)
+    assert news_store.refresh_in_background(['S2'], store, blocking, max_running=2) is None
+    release.set()
+    for thread in list(news_store._refreshes.values()):
+        thread.join(5)
+    third = news_store.refresh_in_background(['S2'], store, blocking, max_running=2)
+    assert third is not None
+    third.join(5)
+    assert list(news_store._refreshes) == [('S2',)]
+    assert store.latest('S2').guid.tolist() == ['S2-0']
@@ -0,0 +1,142 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import predictor
+
+#stands in for the LSTM, predicts the mean of each window so any change inside a window shows up
+class MeanModel:
+    def __init__(self):
+        self.windows = 0
+
+    def predict(self, x, verbose=0, batch_size=None):
+        self.windows += len(x)
+        return x.mean(axis=1).astype(np.float32)
+
+def bars(rows=500, seed=0):
+    index = pd.bdate_range('2020-01-01', periods=rows, name='Date')
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, rows)))
+    return pd.DataFrame({'Close': close}, index=index)
+
+#the last 50 bars retrace the 50 before them, so they stay inside the range fitted on the first 450
+def retraced(rows=500):
+    df = bars(rows)
+    df.iloc[-50:, 0] = df['Close'].iloc[-100:-50].to_numpy()[::-1]
+    return df
+
+def test_refresh_scores_only_new_bars(tmp_path):
+    df = retraced()
+    model = MeanModel()
+    engine = predictor.IncrementalPredictor(str(tmp_path))
+    first, _ = engine.update('AAPL', df.iloc[:450], model, 'm1')
+    assert model.windows == len(first) + 1
+    model.windows = 0
+    updated, forecast = engine.update('AAPL', df, model, 'm1')
+    assert model.windows == 50 + 1
+    assert len(updated) == len(first) + 50
+    pd.testing.assert_frame_equal(updated.iloc[:len(first)], first, check_freq=False)
+    assert updated['original_test_data'].to_numpy().tolist() == df['Close'].to_numpy(dtype=np.float32)[-len(updated):].tolist()
+    assert forecast is not None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+#an intraday close stored on one refresh and revised by the next is scored again, as if it had been final all along
+def test_revised_last_bar_is_rescored(tmp_path):
+    df = retraced()
+    partial = df.iloc[:450].copy()
+    partial.iloc[-1, 0] = partial['Close'].iloc[315:].mean()
+
+    revised = predictor.IncrementalPredictor(str(tmp_path / 'revised'))
+    revised.update('AAPL', partial, MeanModel(), 'm1')
+    model = MeanModel()
+    result, forecast = revised.update('AAPL', df, model, 'm1')
+    assert model.windows == 50 + 1 + 1
+
+    final = predictor.IncrementalPredictor(str(tmp_path / 'final'))
+    final.update('AAPL', df.iloc[:450], MeanModel(), 'm1')
+    expected, expected_forecast = final.update('AAPL', df, MeanModel(), 'm1')
+    pd.testing.assert_frame_equal(result, expected)
+    assert forecast == pytest.approx(expected_forecast)
+
+def test_unchanged_data_is_not_rewritten(tmp_path):
+    df = bars()
+    engine = predictor.IncrementalPredictor(str(tmp_path))
+    engine.update('AAPL', df, MeanModel(), 'm1')
+    _, data_path = engine._paths('AAPL')
+    os.utime(data_path, (0, 0))
+    model = MeanModel()
+    engine.update('AAPL', df, model, 'm1')
+    assert os.path.getmtime(data_path) == 0
+    assert model.windows == 1
+
+def test_new_model_rebuilds_everything(tmp_path):
+    df = bars()
+    engine = predictor.IncrementalPredictor(str(tmp_path))
+    first, _ = engine.update('AAPL', df, MeanModel(), 'm1')
+    model = MeanModel()
+    engine.update('AAPL', df, model, 'm2')
+    assert model.windows == len(first) + 1
+    assert engine._read('AAPL')[0]['model_id'] == 'm2'
+
+@pytest.fixture
+def local_prices(tmp_path, monkeypatch):
+    import price_store
+    import model_registry
+    frames = {'AAPL': bars(seed=1), 'MSFT': bars(seed=2), 'NEW': bars(rows=200, seed=3), 'EMPTY': bars().iloc[:0]}
+    monkeypatch.setattr(price_store, '_default_store', price_store.PriceStore(str(tmp_path), price_store.LocalFetcher(frames)))
+    monkeypatch.setattr(model_registry, 'get_model', lambda *args, **kwargs: MeanModel())
+    return frames
+
+#every ticker comes back either scored or with a reason, never silently dropped
+def test_predict_parallel_reports_every_missing_ticker(local_prices):
+    tickers = ['AAPL', 'NEW', 'MSFT', 'EMPTY', 'GONE']
+    results, errors = predictor.predict_parallel(tickers, '2020-01-01', '2022-01-01', workers=1, chunk_size=2)
+    assert sorted(results['ticker'].unique()) == ['AAPL', 'MSFT']
+    assert sorted(errors) == ['EMPTY', 'GONE', 'NEW']
+    assert errors['GONE'] == errors['EMPTY'] == 'no price data'
+    assert 'not enough history' in errors['NEW']
+
+#a chunk that fails in the single worker is reported per ticker like in the pool, the other chunks still score
+def test_predict_parallel_keeps_going_after_a_failed_chunk(local_prices, monkeypatch):
+    score_chunk = predictor._score_chunk
+
+    def failing(tickers, *args):
+        if 'MSFT' in tickers:
+            raise RuntimeError('worker died')
+        return score_chunk(tickers, *args)
+
+    monkeypatch.setattr(predictor, '_score_chunk', failing)
+    results, errors = predictor.predict_parallel(['AAPL', 'MSFT', 'NEW'], '2020-01-01', '2022-01-01', workers=1, chunk_size=1)
+    assert results['ticker'].unique().tolist() == ['AAPL']
+    assert errors['MSFT'] == repr(RuntimeError('worker died'))
+    assert 'not enough history' in errors['NEW']
+
+#too few bars for a test window scores nothing and has no forecast, it is not an error
+def test_short_history_has_no_predictions(tmp_path):
+    engine = predictor.IncrementalPredictor(str(tmp_path))
+    predictions, forecast = engine.update('AAPL', bars(rows=80), MeanModel(), 'm1')
+    assert len(predictions) == 0 and list(predictions.columns) == ['original_test_data', 'predictions']
+    assert forecast is None
+    predictions, forecast = engine.update('AAPL', bars(rows=200), MeanModel(), 'm1')
+    assert len(predictions) == 0 and forecast is not None
+
+def test_predict_frames_without_windows_is_empty_and_dated():
+    results = predictor.predict_frames({'AAPL': bars(rows=200), 'NONE': None}, MeanModel())
+    assert len(results) == 0
+    assert isinstance(results.index, pd.DatetimeIndex)
+    assert list(results.columns) == ['ticker', 'original_test_data', 'predictions']
+
+#a rally past the fitted range refits the scaler, as if the whole history had been scored in one go
+def test_close_outside_the_scaler_range_rebuilds(tmp_path):
+    df = bars()
+    df.iloc[450:, 0] = df['Close'].iloc[449] * np.linspace(1.05, 1.4, 50)
+    engine = predictor.IncrementalPredictor(str(tmp_path))
+    engine.update('AAPL', df.iloc[:450], MeanModel(), 'm1')
+    model = MeanModel()
+    result, forecast = engine.update('AAPL', df, model, 'm1')
+
+    expected, expected_forecast = predictor.IncrementalPredictor(str(tmp_path / 'full')).update('AAPL', df, MeanModel(), 'm1')
+    assert model.windows == len(expected) + 1
+    pd.testing.assert_frame_equal(result, expected)
+    assert forecast == pytest.approx(expected_forecast)
+    assert forecast == pytest.approx(df['Close'].iloc[-predictor.WINDOW:].mean(), rel=1e-5)
+    assert engine._read('AAPL')[0]['data_max'] == pytest.approx(df['Close'].max())
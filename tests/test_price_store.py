@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import price_store
+
+def bars(start='2020-01-01', end='2021-01-01', seed=0):
+    index = pd.bdate_range(start, end, inclusive='left', name='Date')
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, len(index))))
+    return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1000.0}, index=index)
+
+def test_first_load_fetches_the_whole_range(tmp_path):
+    fetcher = price_store.LocalFetcher({'AAPL': bars()})
+    store = price_store.PriceStore(str(tmp_path), fetcher)
+    df = store.load('AAPL', '2020-01-01', '2020-07-01')
+    assert fetcher.calls == [('AAPL', pd.Timestamp('2020-01-01'), pd.Timestamp('2020-07-01'))]
+    assert df.index[0] == pd.Timestamp('2020-01-01') and df.index[-1] == pd.Timestamp('2020-06-30')
+
+def test_cached_range_is_not_fetched_again(tmp_path):
+    fetcher = price_store.LocalFetcher({'AAPL': bars()})
+    store = price_store.PriceStore(str(tmp_path), fetcher)
+    first = store.load('AAPL', '2020-01-01', '2020-07-01')
+    again = price_store.PriceStore(str(tmp_path), fetcher).load('AAPL', '2020-02-01', '2020-06-01')
+    assert len(fetcher.calls) == 1
+    pd.testing.assert_frame_equal(again, first.loc['2020-02-01':'2020-05-31'], check_freq=False)
+
+#extending the end only asks for the bars after the last stored one, from the complete bar before it
+#so a partial last bar is replaced and an adjusted history shows up
+def test_top_up_fetches_only_the_delta(tmp_path):
+    full = bars()
+    fetcher = price_store.LocalFetcher({'AAPL': full})
+    store = price_store.PriceStore(str(tmp_path), fetcher)
+    store.load('AAPL', '2020-01-01', '2020-07-01')
+    df = store.load('AAPL', '2020-01-01', '2020-08-01')
+    assert fetcher.calls[1:] == [('AAPL', pd.Timestamp('2020-06-29'), pd.Timestamp('2020-08-01'))]
+    pd.testing.assert_frame_equal(df, full.loc[:'2020-07-31'], check_freq=False)
+
+def test_earlier_start_fetches_only_the_missing_head(tmp_path):
+    fetcher = price_store.LocalFetcher({'AAPL': bars()})
+    store = price_store.PriceStore(str(tmp_path), fetcher)
+    store.load('AAPL', '2020-03-01', '2020-07-01')
+    store.load('AAPL', '2020-01-01', '2020-07-01')
+    assert fetcher.calls[1:] == [('AAPL', pd.Timestamp('2020-01-01'), pd.Timestamp('2020-03-03'))]
+
+def test_load_many_records_failures(tmp_path):
+    def fetcher(ticker, start, end):
+        if ticker == 'BAD':
+            raise ConnectionError('offline')
+        return price_store.LocalFetcher({'AAPL': bars()})(ticker, start, end)
+
+    store = price_store.PriceStore(str(tmp_path), fetcher)
+    errors = {}
+    frames = price_store.load_many(['AAPL', 'BAD'], '2020-01-01', '2020-02-01', store=store, errors=errors, columns=['Close'])
+    assert list(frames) == ['AAPL'] and list(frames['AAPL'].columns) == ['Close']
+    assert isinstance(errors['BAD'], ConnectionError)
+
+#tickers with different histories line up on one index, a ticker the fetcher has nothing for is left out
+def test_load_close_frame_aligns_tickers(tmp_path):
+    frames = {'AAPL': bars(seed=1), 'MSFT': bars('2020-03-02', seed=2)}
+    store = price_store.PriceStore(str(tmp_path), price_store.LocalFetcher(frames))
+    close = price_store.load_close_frame(['AAPL', 'MSFT', 'NONE'], '2020-01-01', '2020-06-01', store=store, max_workers=3)
+    assert list(close.columns) == ['AAPL', 'MSFT']
+    assert close.index.is_monotonic_increasing
+    assert close.index.equals(frames['AAPL'].loc[:'2020-05-31'].index)
+    assert close['MSFT'].first_valid_index() == pd.Timestamp('2020-03-02')
+    assert close.loc['2020-03-02':, 'MSFT'].equals(frames['MSFT'].loc[:'2020-05-31', 'Close'].rename('MSFT'))
+
+#a 2:1 split between two loads halves every past close at the provider, the stored bars are replaced, not spliced
+def test_adjusted_history_is_refetched(tmp_path):
+    full = bars()
+    frames = {'AAPL': full.copy()}
+    fetcher = price_store.LocalFetcher(frames)
+    store = price_store.PriceStore(str(tmp_path), fetcher)
+    store.load('AAPL', '2020-01-01', '2020-07-01')
+    frames['AAPL'] = full.assign(Close=full.Close / 2)
+    df = store.load('AAPL', '2020-01-01', '2020-08-01')
+    assert fetcher.calls[-1] == ('AAPL', pd.Timestamp('2020-01-01'), pd.Timestamp('2020-08-01'))
+    pd.testing.assert_series_equal(df.Close, full.Close.loc[:'2020-07-31'] / 2, check_freq=False)
+    pd.testing.assert_frame_equal(store.read('AAPL'), df, check_freq=False)
+
+def test_partial_last_bar_is_replaced_without_a_refetch(tmp_path):
+    full = bars()
+    partial = full.loc[:'2020-06-30'].copy()
+    partial.iloc[-1, partial.columns.get_loc('Close')] *= 1.03
+    frames = {'AAPL': partial}
+    fetcher = price_store.LocalFetcher(frames)
+    store = price_store.PriceStore(str(tmp_path), fetcher)
+    store.load('AAPL', '2020-01-01', '2020-07-01')
+    frames['AAPL'] = full
+    df = store.load('AAPL', '2020-01-01', '2020-08-01')
+    assert len(fetcher.calls) == 2
+    pd.testing.assert_frame_equal(df, full.loc[:'2020-07-31'], check_freq=False)
+
+#yfinance answers an outage with an empty frame, the missing range must be asked for again later
+def test_empty_segment_is_retried(tmp_path):
+    full = bars('2019-01-01', '2021-01-01')
+    online = [True]
+
+    def fetcher(ticker, start, end):
+        if not online[0]:
+            return pd.DataFrame()
+        return price_store.LocalFetcher({'AAPL': full})(ticker, start, end)
+
+    store = price_store.PriceStore(str(tmp_path), fetcher)
+    store.load('AAPL', '2020-01-01', '2021-01-01')
+    online[0] = False
+    assert len(store.load('AAPL', '2019-01-01', '2021-01-01')) == len(full.loc['2020'])
+    online[0] = True
+    df = store.load('AAPL', '2019-01-01', '2021-01-01')
+    pd.testing.assert_frame_equal(df, full, check_freq=False)
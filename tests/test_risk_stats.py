@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+import risk_stats
+
+#max drawdown of every trailing window computed one window at a time
+def brute_force_rolling_max_drawdown(returns, window):
+    wealth = (1 + returns.fillna(0)).cumprod().to_numpy()
+    out = np.full(wealth.shape, np.nan)
+    for t in range(window - 1, len(wealth)):
+        for j in range(wealth.shape[1]):
+            w = wealth[t-window+1:t+1, j]
+            peak = w[0]
+            worst = 0.0
+            for v in w:
+                peak = max(peak, v)
+                worst = min(worst, v / peak - 1)
+            out[t, j] = worst
+    return out
+
+def test_rolling_max_drawdown_matches_brute_force_on_gbm():
+    rng = np.random.default_rng(0)
+    returns = pd.DataFrame(np.exp(rng.normal(0.0003, 0.02, (400, 3))) - 1,
+                           index=pd.bdate_range('2020-01-01', periods=400), columns=['A', 'B', 'C'])
+    returns.iloc[5:9, 1] = np.nan
+    result = risk_stats.rolling_max_drawdown(returns, 63)
+    np.testing.assert_allclose(result.to_numpy(), brute_force_rolling_max_drawdown(returns, 63), atol=1e-12)
+
+#windows that split the bars into whole blocks, leave a remainder, cover everything or hold a single bar
+@pytest.mark.parametrize('rows, window', [(120, 20), (121, 20), (20, 20), (19, 20), (50, 1), (50, 7)])
+def test_rolling_max_drawdown_matches_brute_force_for_any_alignment(rows, window):
+    rng = np.random.default_rng(rows + window)
+    returns = pd.DataFrame(rng.normal(0, 0.03, (rows, 2)), columns=['A', 'B'])
+    result = risk_stats.rolling_max_drawdown(returns, window)
+    np.testing.assert_allclose(result.to_numpy(), brute_force_rolling_max_drawdown(returns, window), atol=1e-12)
+
+def test_rolling_max_drawdown_forgets_a_drop_once_it_leaves_the_window():
+    prices = pd.Series([100.0] * 10 + [50.0] * 20)
+    returns = risk_stats.daily_returns(prices.to_frame('P'))
+    result = risk_stats.rolling_max_drawdown(returns, 5)['P']
+    drop = returns.index[returns['P'] < 0][0]
+    # the pre-drop high stays in the 5 day wealth window for the drop day and the 3 days after it
+    assert (result.loc[drop:drop+3] == -0.5).all()
+    assert (result.loc[drop+4:] == 0).all()
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+import news_store
+import price_store
+import sentiment
+
+#vader style compound score of a summed valence
+def compound(total):
+    return total / np.sqrt(total * total + sentiment.NORMALIZATION_ALPHA)
+
+def article(guid, title, published, summary=''):
+    return {'guid': guid, 'title': title, 'summary': summary, 'link': f'https://example.com/{guid}', 'published': published}
+
+FEED = [
+    article('a1', 'Apple shares surge on strong profit', 'Mon, 06 Jan 2025 14:00:00 +0000'),
+    article('a2', 'Apple faces lawsuit', 'Mon, 06 Jan 2025 22:00:00 +0000'),
+    article('a3', 'Apple is not weak', 'Tue, 07 Jan 2025 15:00:00 +0000', 'Analysts see growth'),
+    article('a4', 'Apple stock tumbles', 'Fri, 10 Jan 2025 21:30:00 +0000'),
+    article('a5', 'Apple wins appeal', 'Sat, 11 Jan 2025 12:00:00 +0000'),
+]
+
+def bars():
+    index = pd.bdate_range('2025-01-02', '2025-01-31', name='Date')
+    open_ = np.full(len(index), 100.0)
+    close = open_ + np.where(np.arange(len(index)) % 2, -1.0, 1.0)
+    return pd.DataFrame({'Open': open_, 'High': close + 1, 'Low': open_ - 1, 'Close': close, 'Volume': 1e6}, index=index)
+
+@pytest.fixture(autouse=True)
+def finance_lexicon(monkeypatch):
+    monkeypatch.setattr(sentiment, '_lexicon', dict(sentiment.FINANCE_LEXICON))
+
+@pytest.fixture
+def stores(tmp_path):
+    news = news_store.NewsStore(str(tmp_path / 'news.sqlite'))
+    prices = price_store.PriceStore(str(tmp_path / 'prices'), price_store.LocalFetcher({'AAPL': bars()}))
+    return news, prices, sentiment.SentimentStore(str(tmp_path / 'sentiment'))
+
+def test_score_sums_valences_and_flips_negated_words():
+    scores = sentiment.score(['Apple shares surge on strong profit', 'Apple is not weak', 'no news', None])
+    assert scores == pytest.approx([compound(2.0 + 2.3 + 1.9), compound(-1.9 * sentiment.NEGATION_SCALE), 0, 0])
+
+def test_scores_are_the_same_in_any_batch_size():
+    titles = [a['title'] for a in FEED] * 7
+    assert sentiment.score(titles, batch_size=3) == pytest.approx(sentiment.score(titles))
+
+#the close is 16:00 in New York, 21:00 UTC in winter and 20:00 UTC in summer
+def test_check_day_follows_the_new_york_close():
+    published = pd.Series(pd.to_datetime(['2025-01-06 14:00', '2025-01-06 20:30', '2025-01-06 21:00',
+                                           '2025-07-07 19:59', '2025-07-07 20:00'], utc=True))
+    check = sentiment.check_days(published)
+    assert check.dt.strftime('%Y-%m-%d').tolist() == ['2025-01-06', '2025-01-06', '2025-01-07', '2025-07-07', '2025-07-08']
+
+#a late article doesn't drag the earlier articles of its calendar day onto the next session
+def test_articles_before_and_after_the_close_are_split():
+    articles = pd.DataFrame(FEED[:3]).assign(stock='aapl', published=lambda df: news_store.parse_dates(df.published))
+    daily = sentiment.daily_sentiment(articles)
+    assert daily['check'].dt.strftime('%Y-%m-%d').tolist() == ['2025-01-06', '2025-01-07']
+    assert daily['news_dt'].tolist() == [pd.Timestamp('2025-01-06 14:00'), pd.Timestamp('2025-01-07 15:00')]
+    assert daily['sentiment_title_avg'].tolist() == pytest.approx(
+        [compound(6.2), (compound(-1.8) + compound(-1.9 * sentiment.NEGATION_SCALE)) / 2])
+    assert daily['sentiment_summary_med'].tolist() == pytest.approx([0, compound(1.6) / 2])
+
+def test_update_joins_the_next_bar_and_resumes_from_the_first_unchecked_day(stores, monkeypatch):
+    news, prices, store = stores
+    feeds = news_store.LocalFeeds({'AAPL': FEED})
+    news_store.ingest(['AAPL'], news, feeds)
+    first = sentiment.update(['aapl'], news, store, prices, today='2025-01-13')
+    assert first[['id', 'check_day', 'change']].values.tolist() == [
+        ['AAPL_2025-01-06', '2025-01-06', 'win'],
+        ['AAPL_2025-01-07', '2025-01-07', 'loss'],
+        ['AAPL_2025-01-11', '2025-01-11', 'UNCHECKED'],
+    ]
+    assert first['close'].iloc[:2].tolist() == [101.0, 99.0]
+    assert np.isnan(first['close'].iloc[2])
+
+    # a later run scores again from the start of the unchecked day's news, the Friday evening article included
+    calls = []
+    articles = news.articles
+
+    def recorded(stocks, since=None):
+        calls.append(since)
+        return articles(stocks, since)
+
+    monkeypatch.setattr(news, 'articles', recorded)
+    feeds.feeds['AAPL'] = FEED + [article('a6', 'Apple record high', 'Mon, 13 Jan 2025 13:00:00 +0000')]
+    news_store.ingest(['AAPL'], news, feeds)
+    second = sentiment.update(['AAPL'], news, store, prices, today='2025-01-15')
+    assert calls == [pd.Timestamp('2025-01-10 21:00', tz='UTC')]
+    assert second['id'].tolist() == ['AAPL_2025-01-11', 'AAPL_2025-01-13']
+    assert second['check_day'].tolist() == ['2025-01-13', '2025-01-13']
+    assert second['change'].tolist() == ['loss', 'loss']
+    assert second['sentiment_title_avg'].tolist() == pytest.approx([(compound(-2.0) + compound(2.7)) / 2, compound(2.0)])
+
+    stored = store.read(['AAPL'])
+    assert stored['id'].tolist() == ['AAPL_2025-01-06', 'AAPL_2025-01-07', 'AAPL_2025-01-11', 'AAPL_2025-01-13']
+    assert (stored['change'] != 'UNCHECKED').all()
+    pd.testing.assert_frame_equal(stored.iloc[:2], first.iloc[:2], check_dtype=False)
+
+def test_write_csv_uses_the_data_csv_layout(stores, tmp_path):
+    news, prices, store = stores
+    news_store.ingest(['AAPL'], news, news_store.LocalFeeds({'AAPL': FEED}))
+    sentiment.update(['AAPL'], news, store, prices, today='2025-01-20')
+    path = tmp_path / 'data.csv'
+    store.write_csv(str(path))
+    csv = pd.read_csv(path, sep=';')
+    assert list(csv.columns) == sentiment.SCHEMA
+    assert csv['news_dt'].tolist()[0] == '2025-01-06 14:00:00'
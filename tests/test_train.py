@@ -0,0 +1,18 @@
+import train
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+#a model trained with --no-export has no .npz, the old weights must not stay next to it
+def test_promote_replaces_every_file_and_drops_stale_sidecars(tmp_path):
+    target = tmp_path / 'Latest_stock_price_model.keras'
+    for suffix in ('.keras', '.npz', '.scalers.json'):
+        write(tmp_path / f'Latest_stock_price_model{suffix}', 'old')
+    (tmp_path / 'models').mkdir()
+    new = write(tmp_path / 'models' / 'lstm-1.keras', 'new')
+    write(tmp_path / 'models' / 'lstm-1.scalers.json', 'new')
+    assert train.promote(new, str(target)) == str(target)
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_file()) == [
+        'Latest_stock_price_model.keras', 'Latest_stock_price_model.scalers.json']
+    assert target.read_text() == (tmp_path / 'Latest_stock_price_model.scalers.json').read_text() == 'new'
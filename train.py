@@ -0,0 +1,181 @@
+import os
+import json
+import shutil
+import argparse
+from datetime import datetime
+import numpy as np
+import price_store
+
+WINDOW = 100
+SPLIT = 0.7
+TRAINING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'training')
+# new models land here, the app only sees one after promote() copies it to the production name
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+PRODUCTION_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Latest_stock_price_model.keras')
+SIDECARS = ('.npz', '.scalers.json')
+
+def default_output():
+    return os.path.join(MODEL_DIR, datetime.now().strftime('lstm-%Y%m%d-%H%M%S.keras'))
+
+#write every ticker's min-max scaled closes into one float32 file, one ticker in memory at a time
+#returns the per ticker offsets and scaler ranges needed to read windows back and undo the scaling
+def build_series_file(tickers, start, end, path, store=None, column='Close', window=WINDOW):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    entries = []
+    offset = 0
+    with open(path, 'wb') as f:
+        for ticker in tickers:
+            df = price_store.load_prices(ticker, start, end, store=store)
+            if column not in df:
+                continue
+            close = df[column].dropna().to_numpy(dtype=np.float64)
+            if len(close) <= window + 1:
+                continue
+            data_min, data_max = float(close.min()), float(close.max())
+            scaled = ((close - data_min) / ((data_max - data_min) or 1.0)).astype(np.float32)
+            scaled.tofile(f)
+            entries.append({'ticker': ticker, 'offset': offset, 'length': len(scaled),
+                            'data_min': data_min, 'data_max': data_max,
+                            'first_date': str(df.index[0].date()), 'last_date': str(df.index[-1].date())})
+            offset += len(scaled)
+    return entries
+
+#first index of every window, windows never cross from one ticker into the next
+#the first split of each ticker's windows trains, the rest validates, like the notebook's 70-30 split
+def window_starts(entries, window=WINDOW, split=SPLIT):
+    train, valid = [], []
+    for e in entries:
+        starts = np.arange(e['offset'], e['offset'] + e['length'] - window, dtype=np.int64)
+        cut = int(len(starts) * split)
+        train.append(starts[:cut])
+        valid.append(starts[cut:])
+    return np.concatenate(train), np.concatenate(valid)
+
+#tf.data pipeline that gathers whole batches of windows from the memory mapped series
+def make_dataset(series, starts, window=WINDOW, batch_size=256, shuffle=True, cache=None, seed=0):
+    import tensorflow as tf
+    offsets = np.arange(window + 1)
+
+    def gather(batch_starts):
+        rows = series[batch_starts[:, None] + offsets]
+        return rows[:, :window, None], rows[:, window:]
+
+    def load(batch_starts):
+        x, y = tf.numpy_function(gather, [batch_starts], (tf.float32, tf.float32))
+        x.set_shape((None, window, 1))
+        y.set_shape((None, 1))
+        return x, y
+
+    ds = tf.data.Dataset.from_tensor_slices(starts)
+    if shuffle:
+        ds = ds.shuffle(min(len(starts), 100_000), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE)
+    if cache is not None:
+        ds = ds.cache(cache)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+#same architecture as the notebook
+def build_model(window=WINDOW):
+    from tensorflow.keras.models import Sequential # type: ignore
+    from tensorflow.keras.layers import LSTM, Dense, Input # type: ignore
+    model = Sequential([
+        Input(shape=(window, 1)),
+        LSTM(128, return_sequences=True),
+        LSTM(64, return_sequences=False),
+        Dense(25, activation='relu'),
+        Dense(1)
+    ])
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+def train(tickers, start, end, output=None, epochs=2, batch_size=256,
+          workdir=TRAINING_DIR, store=None, threads=None, export_numpy=True):
+    output = output or default_output()
+    import tensorflow as tf
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    series_path = os.path.join(workdir, 'series.f32')
+    entries = build_series_file(tickers, start, end, series_path, store=store)
+    if not entries:
+        raise ValueError('none of the tickers had enough history to train on')
+    series = np.memmap(series_path, dtype=np.float32, mode='r')
+    train_starts, valid_starts = window_starts(entries)
+
+    # validation batches are gathered from the memory map again every epoch rather than held in memory
+    train_ds = make_dataset(series, train_starts, batch_size=batch_size)
+    valid_ds = make_dataset(series, valid_starts, batch_size=batch_size, shuffle=False)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    model = build_model()
+    history = model.fit(train_ds, validation_data=valid_ds, epochs=epochs)
+    model.save(output)
+
+    metadata = {
+        'model': os.path.basename(output),
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'window': WINDOW,
+        'split': SPLIT,
+        'epochs': epochs,
+        'train_windows': int(len(train_starts)),
+        'valid_windows': int(len(valid_starts)),
+        'loss': [float(v) for v in history.history.get('loss', [])],
+        'val_loss': [float(v) for v in history.history.get('val_loss', [])],
+        'scalers': {e['ticker']: {k: e[k] for k in ('data_min', 'data_max', 'first_date', 'last_date')} for e in entries},
+    }
+    with open(os.path.splitext(output)[0] + '.scalers.json', 'w') as f:
+        json.dump(metadata, f, indent=1)
+
+    if export_numpy:
+        import lstm_numpy
+        lstm_numpy.export(output, os.path.splitext(output)[0] + '.npz')
+    return model, metadata
+
+#copy a trained model and its sidecar files over the production model the app loads
+#a sidecar the new model doesn't have is removed, otherwise the old one would be served next to the new model
+def promote(path, target=PRODUCTION_MODEL):
+    src, dst = os.path.splitext(path)[0], os.path.splitext(target)[0]
+    for suffix in ('.keras',) + SIDECARS:
+        if os.path.exists(src + suffix):
+            shutil.copyfile(src + suffix, dst + suffix + '.tmp')
+            os.replace(dst + suffix + '.tmp', dst + suffix)
+        elif os.path.exists(dst + suffix):
+            os.remove(dst + suffix)
+    return target
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the LSTM on many tickers with a streaming tf.data pipeline.')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--tickers', nargs='+', help='ticker symbols')
+    group.add_argument('--file', help='file with one ticker per line')
+    group.add_argument('--sp500', action='store_true', help='train on the S&P 500 universe')
+    parser.add_argument('--years', type=int, default=20, help='years of history to load')
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--threads', type=int, help='tensorflow threads, defaults to all cores')
+    parser.add_argument('--output', help='defaults to a timestamped file under models/')
+    parser.add_argument('--promote', action='store_true', help='replace Latest_stock_price_model.* with the new model')
+    parser.add_argument('--workdir', default=TRAINING_DIR, help='where the memory mapped series is written')
+    parser.add_argument('--no-export', action='store_true', help='skip writing the numpy backend weights')
+    args = parser.parse_args(argv)
+
+    import universe
+    if args.sp500:
+        tickers = universe.sp500_symbols()
+    elif args.file:
+        tickers = universe.read_ticker_file(args.file)
+    else:
+        tickers = args.tickers
+
+    end = datetime.now()
+    start = datetime(end.year-args.years, end.month, end.day)
+    output = args.output or default_output()
+    _, metadata = train(tickers, start, end, output=output, epochs=args.epochs, batch_size=args.batch_size,
+                        workdir=args.workdir, threads=args.threads, export_numpy=not args.no_export)
+    print(f"trained on {len(metadata['scalers'])} tickers, {metadata['train_windows']} windows, wrote {output}")
+    if args.promote:
+        print(f"promoted to {promote(output)}")
+
+if __name__ == '__main__':
+    main()
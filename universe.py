@@ -0,0 +1,21 @@
+import pandas as pd
+
+SP500_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+
+#S&P 500 constituents table scraped from wikipedia
+def sp500_table():
+    html = pd.read_html(SP500_URL, header=0)
+    return html[0]
+
+#yahoo writes class shares with a dash, BRK.B -> BRK-B
+def yahoo_symbol(symbol):
+    return symbol.replace('.', '-')
+
+def sp500_symbols():
+    return [yahoo_symbol(s) for s in sp500_table().Symbol]
+
+#one ticker per line, blank lines and # comments are skipped
+def read_ticker_file(path):
+    with open(path) as f:
+        lines = [line.split('#')[0].strip() for line in f]
+    return [line for line in lines if line]
@@ -0,0 +1,19 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+#(N, window, features) windows over a (T,) or (T, features) array without copying, window i is rows i..i+window-1
+def sliding_windows(values, window):
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, None]
+    if len(values) < window:
+        return np.empty((0, window, values.shape[1]), dtype=values.dtype)
+    return np.moveaxis(sliding_window_view(values, window, axis=0), -1, 1)
+
+#model inputs and targets, x[i] = values[i:i+window] and y[i] = values[i+window]
+#same pairs as the loop "for i in range(window, len(values))", as views on values
+def make_xy(values, window=100):
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, None]
+    return sliding_windows(values[:-1], window), values[window:]